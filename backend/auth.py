@@ -10,8 +10,11 @@ from database import get_db
 import models
 from clerk_backend_api import Clerk
 import jwt
+import logging
 import requests
 
+logger = logging.getLogger(__name__)
+
 # Clerk configuration
 CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY")
 
@@ -56,7 +59,7 @@ def verify_clerk_token(token: str) -> dict:
         # Clerk tokens are signed, but we'll verify by fetching the user with our secret key
         decoded = jwt.decode(token, options={"verify_signature": False})
         
-        print(f"DEBUG: Decoded token: {decoded}")
+        logger.debug("Decoded token: %s", decoded)
         
         # Get the user_id or sub from the token
         user_id = decoded.get("sub") or decoded.get("user_id")
@@ -68,14 +71,14 @@ def verify_clerk_token(token: str) -> dict:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        print(f"DEBUG: User ID from token: {user_id}")
+        logger.debug("User ID from token: %s", user_id)
         
         # Verify by fetching the user from Clerk using our secret key
         try:
             user = clerk.users.get(user_id=user_id)
-            print(f"DEBUG: Successfully fetched user from Clerk: {user.id}")
+            logger.debug("Successfully fetched user from Clerk: %s", user.id)
         except Exception as e:
-            print(f"DEBUG: Failed to fetch user from Clerk: {str(e)}")
+            logger.debug("Failed to fetch user from Clerk: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=f"Invalid token: could not verify user ({str(e)})",
@@ -101,14 +104,14 @@ def verify_clerk_token(token: str) -> dict:
     except HTTPException:
         raise
     except jwt.DecodeError as e:
-        print(f"DEBUG: JWT decode error: {str(e)}")
+        logger.debug("JWT decode error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid token format: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
     except Exception as e:
-        print(f"DEBUG: Token verification error: {str(e)}")
+        logger.debug("Token verification error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Token verification failed: {str(e)}",
@@ -152,9 +155,9 @@ def get_current_user(
         db.add(user)
         db.commit()
         db.refresh(user)
-        print(f"DEBUG: Created new user with clerk_id: {clerk_id}")
+        logger.debug("Created new user with clerk_id: %s", clerk_id)
     else:
-        print(f"DEBUG: Found existing user with clerk_id: {clerk_id}")
+        logger.debug("Found existing user with clerk_id: %s", clerk_id)
     
     return user
 
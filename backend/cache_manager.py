@@ -1,8 +1,21 @@
+import functools
+import io
 import os
 import json
+import logging
+import sqlite3
+import threading
+import time
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same files but slower
+    orjson = None
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+logger = logging.getLogger(__name__)
+
 # Use volume path from Railway or Fly.io, otherwise local directory
 # Railway uses RAILWAY_VOLUME_MOUNT_PATH, Fly.io uses CACHE_PATH
 CACHE_PATH_ENV = os.getenv("CACHE_PATH") or os.getenv("RAILWAY_VOLUME_MOUNT_PATH")
@@ -14,6 +27,160 @@ else:
 # Base directory for storing video processing data
 CACHE_DIR = BASE_DIR / "cache"
 
+# Results keyed by a hash of their inputs rather than by video. Kept outside
+# CACHE_DIR so list_cached_videos() does not pick it up as a video
+CONTENT_CACHE_DIR = BASE_DIR / "content_cache"
+
+
+# In-process LRU over step files and frames, so a warm pipeline does not re-read
+# and re-parse the same files. Steps are held as serialized JSON text so every
+# load still returns a fresh object that callers may mutate.
+_MEMORY_MAX_STEPS = int(os.getenv("CACHE_MEMORY_MAX_STEPS", "256"))
+_MEMORY_MAX_FRAME_BYTES = int(os.getenv("CACHE_MEMORY_MAX_FRAME_MB", "64")) * 1024 * 1024
+_step_memory: "OrderedDict[tuple, bytes]" = OrderedDict()
+_frame_memory: "OrderedDict[tuple, bytes]" = OrderedDict()
+_frame_memory_bytes = 0
+_memory_lock = threading.Lock()
+
+
+# Opt-in persistent store for the small, hot steps: one SQLite file in WAL mode
+# with mmap'd reads, so after a restart they come from a single page-cached
+# database instead of one file open per step. The JSON files are still written
+# (and stay the source of truth) because other code reads them by path.
+CACHE_SQLITE_ENABLED = os.getenv("CACHE_SQLITE_ENABLED", "false").lower() == "true"
+CACHE_DB_PATH = BASE_DIR / "cache.db"
+_SQLITE_STEPS = frozenset({"metadata", "transcript", "stream"})
+_sqlite_local = threading.local()
+
+
+def _db() -> sqlite3.Connection:
+    """This thread's connection to the step database, opened on first use"""
+    conn = getattr(_sqlite_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_DB_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS steps ("
+            "video_id TEXT NOT NULL, step TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (video_id, step))"
+        )
+        _sqlite_local.conn = conn
+    return conn
+
+
+def _db_get(video_id: str, step_name: str) -> Optional[bytes]:
+    try:
+        row = _db().execute(
+            "SELECT value FROM steps WHERE video_id = ? AND step = ?", (video_id, step_name)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("Step database read failed: %s", e)
+        return None
+    return row[0] if row else None
+
+
+def _db_put(video_id: str, step_name: str, text: bytes) -> None:
+    try:
+        _db().execute(
+            "INSERT OR REPLACE INTO steps (video_id, step, value) VALUES (?, ?, ?)",
+            (video_id, step_name, text),
+        )
+    except sqlite3.Error as e:
+        logger.warning("Step database write failed: %s", e)
+
+
+def _db_delete(video_id: str, step_name: Optional[str] = None) -> None:
+    """Delete one step of a video, or all of its steps"""
+    try:
+        if step_name is None:
+            _db().execute("DELETE FROM steps WHERE video_id = ?", (video_id,))
+        else:
+            _db().execute("DELETE FROM steps WHERE video_id = ? AND step = ?", (video_id, step_name))
+    except sqlite3.Error as e:
+        logger.warning("Step database delete failed: %s", e)
+
+
+def _dumps(data: Any, indent: bool = True) -> bytes:
+    """Serialize to UTF-8 JSON (2-space indented by default), with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, indent=2).encode()
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json(path: Path) -> Any:
+    """Parse a JSON file; raises FileNotFoundError if it does not exist"""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+
+def write_json(path: Path, data: Any, indent: bool = True) -> None:
+    with open(path, 'wb') as f:
+        f.write(_dumps(data, indent))
+
+
+def _remember_step(video_id: str, step_name: str, text: bytes) -> None:
+    with _memory_lock:
+        _step_memory[(video_id, step_name)] = text
+        _step_memory.move_to_end((video_id, step_name))
+        while len(_step_memory) > _MEMORY_MAX_STEPS:
+            _step_memory.popitem(last=False)
+
+
+def _recall_step(video_id: str, step_name: str) -> Optional[bytes]:
+    with _memory_lock:
+        text = _step_memory.get((video_id, step_name))
+        if text is not None:
+            _step_memory.move_to_end((video_id, step_name))
+        return text
+
+
+def _remember_frame(video_id: str, step_number: str, frame_data: bytes) -> None:
+    global _frame_memory_bytes
+    with _memory_lock:
+        previous = _frame_memory.pop((video_id, step_number), None)
+        if previous is not None:
+            _frame_memory_bytes -= len(previous)
+        _frame_memory[(video_id, step_number)] = frame_data
+        _frame_memory_bytes += len(frame_data)
+        # Bounded by total size rather than count: frames vary a lot in size
+        while _frame_memory_bytes > _MEMORY_MAX_FRAME_BYTES and _frame_memory:
+            _, evicted = _frame_memory.popitem(last=False)
+            _frame_memory_bytes -= len(evicted)
+
+
+def _recall_frame(video_id: str, step_number: str) -> Optional[bytes]:
+    with _memory_lock:
+        frame_data = _frame_memory.get((video_id, step_number))
+        if frame_data is not None:
+            _frame_memory.move_to_end((video_id, step_number))
+        return frame_data
+
+
+def _forget(video_id: str, step_prefix: Optional[str] = None, frames: bool = False) -> None:
+    """
+    Drop in-memory entries for a video: all of them by default, or only steps
+    named step_prefix / step_prefix_* (keyed variants), or only frames.
+    """
+    global _frame_memory_bytes
+    with _memory_lock:
+        if step_prefix is not None or not frames:
+            for key in [k for k in _step_memory if k[0] == video_id]:
+                if step_prefix is None or key[1] == step_prefix or key[1].startswith(f"{step_prefix}_"):
+                    del _step_memory[key]
+        if frames or step_prefix is None:
+            for key in [k for k in _frame_memory if k[0] == video_id]:
+                _frame_memory_bytes -= len(_frame_memory.pop(key))
+
 
 def get_video_cache_dir(video_id: str) -> Path:
     """Get the cache directory for a specific video"""
@@ -27,24 +194,60 @@ def save_step(video_id: str, step_name: str, data: Any) -> None:
     video_dir = get_video_cache_dir(video_id)
     file_path = video_dir / f"{step_name}.json"
     
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    text = _dumps(data)
+    with open(file_path, 'wb') as f:
+        f.write(text)
+    _remember_step(video_id, step_name, text)
+    if CACHE_SQLITE_ENABLED and step_name in _SQLITE_STEPS:
+        _db_put(video_id, step_name, text)
     
-    print(f"DEBUG: Saved {step_name} to cache for video {video_id}")
+    logger.debug("Saved %s to cache for video %s", step_name, video_id)
 
 
 def load_step(video_id: str, step_name: str) -> Optional[Any]:
     """Load data for a specific step if it exists"""
-    video_dir = get_video_cache_dir(video_id)
-    file_path = video_dir / f"{step_name}.json"
+    text = _recall_step(video_id, step_name)
+    use_db = CACHE_SQLITE_ENABLED and step_name in _SQLITE_STEPS
+    if text is None and use_db:
+        text = _db_get(video_id, step_name)
+        if text is not None:
+            _remember_step(video_id, step_name, text)
+    if text is None:
+        video_dir = get_video_cache_dir(video_id)
+        file_path = video_dir / f"{step_name}.json"
+        
+        # Open directly instead of exists() + open(): one syscall fewer on a hit
+        try:
+            with open(file_path, 'rb') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        _remember_step(video_id, step_name, text)
+        if use_db:
+            # Entries cached before the database was enabled move in on first read
+            _db_put(video_id, step_name, text)
+    logger.debug("Loaded %s from cache for video %s", step_name, video_id)
+    return _loads(text)
+
+
+def save_blob(namespace: str, key: str, data: Any) -> None:
+    """Save data under a content hash key"""
+    namespace_dir = CONTENT_CACHE_DIR / namespace
+    namespace_dir.mkdir(parents=True, exist_ok=True)
     
-    if file_path.exists():
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        print(f"DEBUG: Loaded {step_name} from cache for video {video_id}")
-        return data
+    write_json(namespace_dir / f"{key}.json", data)
     
-    return None
+    logger.debug("Saved %s content cache entry %s", namespace, key)
+
+
+def load_blob(namespace: str, key: str) -> Optional[Any]:
+    """Load data saved under a content hash key if it exists"""
+    try:
+        data = read_json(CONTENT_CACHE_DIR / namespace / f"{key}.json")
+    except FileNotFoundError:
+        return None
+    logger.debug("Loaded %s content cache entry %s", namespace, key)
+    return data
 
 
 def save_frame(video_id: str, step_number: str, frame_data: bytes) -> str:
@@ -57,23 +260,89 @@ def save_frame(video_id: str, step_number: str, frame_data: bytes) -> str:
     
     with open(frame_path, 'wb') as f:
         f.write(frame_data)
+    # The WebP copy (see load_frame_webp) was made from the old frame
+    frame_path.with_suffix(".webp").unlink(missing_ok=True)
+    _webp_failed.pop((video_id, step_number), None)
+    _remember_frame(video_id, step_number, frame_data)
     
-    print(f"DEBUG: Saved frame for step {step_number} to cache")
+    logger.debug("Saved frame for step %s to cache", step_number)
     return str(frame_path)
 
 
 def load_frame(video_id: str, step_number: str) -> Optional[bytes]:
     """Load a frame image if it exists"""
-    video_dir = get_video_cache_dir(video_id)
-    frame_path = video_dir / "frames" / f"step_{step_number}.jpg"
-    
-    if frame_path.exists():
-        with open(frame_path, 'rb') as f:
-            frame_data = f.read()
-        print(f"DEBUG: Loaded frame for step {step_number} from cache")
-        return frame_data
+    frame_data = _recall_frame(video_id, step_number)
+    if frame_data is None:
+        video_dir = get_video_cache_dir(video_id)
+        frame_path = video_dir / "frames" / f"step_{step_number}.jpg"
+        
+        try:
+            frame_data = frame_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        _remember_frame(video_id, step_number, frame_data)
+    logger.debug("Loaded frame for step %s from cache", step_number)
+    return frame_data
+
+
+@functools.lru_cache(maxsize=1)
+def _webp_supported() -> bool:
+    """Whether Pillow is installed with a WebP encoder (checked once)"""
+    try:
+        from PIL import features
+    except ImportError:
+        return False
+    supported = features.check("webp")
+    if not supported:
+        logger.warning("Pillow has no WebP support; frames are served as JPEG")
+    return supported
+
+
+# (video_id, step_number) frames whose JPEG could not be converted; not retried.
+# Holds at most _WEBP_FAILED_MAX entries, oldest dropped first
+_WEBP_FAILED_MAX = 1024
+_webp_failed: Dict[tuple, None] = {}
+
+
+def load_frame_webp(video_id: str, step_number: str) -> Optional[bytes]:
+    """
+    WebP copy of a cached frame for browsers, a fraction of the JPEG's size.
+    Made from the JPEG on first request and stored next to it; the JPEG stays
+    the cached original because the PDF renderer embeds JPEGs as they are.
+    Copies are swept like other derived entries (see sweep).
     
-    return None
+    Returns:
+        WebP bytes, or None if there is no frame or it cannot be converted
+        (serve the JPEG instead)
+    """
+    webp_path = get_video_cache_dir(video_id) / "frames" / f"step_{step_number}.webp"
+    try:
+        return webp_path.read_bytes()
+    except FileNotFoundError:
+        pass
+    if not _webp_supported() or (video_id, step_number) in _webp_failed:
+        return None
+    frame_data = load_frame(video_id, step_number)
+    if frame_data is None:
+        return None
+    from PIL import Image
+    buffer = io.BytesIO()
+    try:
+        Image.open(io.BytesIO(frame_data)).save(buffer, format="WEBP", quality=75)
+    except Exception as e:
+        logger.debug("WebP conversion failed for %s step %s: %s", video_id, step_number, e)
+        _webp_failed[(video_id, step_number)] = None
+        if len(_webp_failed) > _WEBP_FAILED_MAX:
+            # Evict the oldest entry (dicts keep insertion order)
+            _webp_failed.pop(next(iter(_webp_failed)), None)
+        return None
+    webp_data = buffer.getvalue()
+    # Write then rename so a concurrent request never reads a partial file
+    tmp_path = webp_path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(webp_data)
+    os.replace(tmp_path, webp_path)
+    logger.debug("Saved WebP copy of frame for step %s (%s -> %s bytes)", step_number, len(frame_data), len(webp_data))
+    return webp_data
 
 
 def get_pipeline_status(video_id: str) -> Dict[str, bool]:
@@ -96,10 +365,13 @@ def clear_cache(video_id: str) -> None:
     """Clear all cached data for a video"""
     import shutil
     video_dir = get_video_cache_dir(video_id)
+    _forget(video_id)
+    if CACHE_SQLITE_ENABLED:
+        _db_delete(video_id)
     
     if video_dir.exists():
         shutil.rmtree(video_dir)
-        print(f"DEBUG: Cleared cache for video {video_id}")
+        logger.debug("Cleared cache for video %s", video_id)
 
 
 def clear_step(video_id: str, step_name: str) -> None:
@@ -108,20 +380,71 @@ def clear_step(video_id: str, step_name: str) -> None:
     video_dir = get_video_cache_dir(video_id)
     
     if step_name == "frames":
+        _forget(video_id, frames=True)
+        # The frames directory also holds the WebP copies (see load_frame_webp)
+        for key in [key for key in list(_webp_failed) if key[0] == video_id]:
+            _webp_failed.pop(key, None)
         frames_dir = video_dir / "frames"
         if frames_dir.exists():
             shutil.rmtree(frames_dir)
-            print(f"DEBUG: Cleared frames for video {video_id}")
+            logger.debug("Cleared frames for video %s", video_id)
     elif step_name == "pdf":
-        pdf_path = video_dir / "recipe.pdf"
-        if pdf_path.exists():
-            pdf_path.unlink()
-            print(f"DEBUG: Cleared pdf for video {video_id}")
+        try:
+            (video_dir / "recipe.pdf").unlink()
+            logger.debug("Cleared pdf for video %s", video_id)
+        except FileNotFoundError:
+            pass
     else:
-        file_path = video_dir / f"{step_name}.json"
-        if file_path.exists():
-            file_path.unlink()
-            print(f"DEBUG: Cleared {step_name} for video {video_id}")
+        _forget(video_id, step_prefix=step_name)
+        if CACHE_SQLITE_ENABLED and step_name in _SQLITE_STEPS:
+            _db_delete(video_id, step_name)
+        try:
+            (video_dir / f"{step_name}.json").unlink()
+            logger.debug("Cleared %s for video %s", step_name, video_id)
+        except FileNotFoundError:
+            pass
+        # Also drop keyed variants of the step (e.g. timestamps_<steps hash>.json)
+        for keyed_path in video_dir.glob(f"{step_name}_*.json"):
+            keyed_path.unlink()
+
+
+# Steps saved under hash-keyed names (<step>_<key>.json) that sweep may expire;
+# every other step file is a plain per-video entry and is never swept
+_KEYED_STEPS = ("timestamps",)
+
+
+def sweep(max_age_days: int = 30) -> int:
+    """
+    Delete content-addressed entries not written for max_age_days: content
+    cache blobs, keyed step variants (e.g. timestamps_<version>_<hash>.json,
+    which a prompt edit leaves behind) and WebP frame copies, which are
+    recreated on demand. The plain per-video step files and frames are kept.
+
+    Returns:
+        Number of files removed
+    """
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    candidates = []
+    if CONTENT_CACHE_DIR.exists():
+        candidates += [(None, path) for path in CONTENT_CACHE_DIR.glob("*/*.json")]
+    if CACHE_DIR.exists():
+        for prefix in _KEYED_STEPS:
+            candidates += [(path.parent.name, path) for path in CACHE_DIR.glob(f"*/{prefix}_*.json")]
+        # Not step files, so nothing to drop from the in-memory cache
+        candidates += [(None, path) for path in CACHE_DIR.glob("*/frames/*.webp")]
+    for video_id, path in candidates:
+        try:
+            if path.stat().st_mtime >= cutoff:
+                continue
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        if video_id is not None:
+            _forget(video_id, step_prefix=path.stem)
+        removed += 1
+    logger.debug("Cache sweep removed %s entries older than %s days", removed, max_age_days)
+    return removed
 
 
 def list_cached_videos() -> list:
@@ -5,8 +5,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from typing import List, Optional
 from datetime import datetime
+import logging
 import models
 
+logger = logging.getLogger(__name__)
+
 
 # ==================== User Operations ====================
 
@@ -64,7 +67,7 @@ def create_recipe(
     db.add(recipe)
     db.commit()
     db.refresh(recipe)
-    print(f"DEBUG: Created new recipe: {title} (video_id: {video_id})")
+    logger.debug("Created new recipe: %s (video_id: %s)", title, video_id)
     return recipe
 
 
@@ -149,7 +152,7 @@ def add_recipe_to_user(db: Session, user_id: int, recipe_id: int) -> models.User
     db.commit()
     db.refresh(user_recipe)
     
-    print(f"DEBUG: Added recipe {recipe_id} to user {user_id}")
+    logger.debug("Added recipe %s to user %s", recipe_id, user_id)
     return user_recipe
 
 
@@ -177,7 +180,7 @@ def remove_recipe_from_user(db: Session, user_id: int, recipe_id: int) -> bool:
     
     db.delete(user_recipe)
     db.commit()
-    print(f"DEBUG: Removed recipe {recipe_id} from user {user_id}")
+    logger.debug("Removed recipe %s from user %s", recipe_id, user_id)
     return True
 
 
@@ -252,7 +255,7 @@ def create_book(
     db.commit()
     db.refresh(book)
     
-    print(f"DEBUG: Created book '{name}' with {len(recipe_ids)} recipes for user {user_id}")
+    logger.debug("Created book '%s' with %s recipes for user %s", name, len(recipe_ids), user_id)
     return book
 
 
@@ -298,7 +301,7 @@ def delete_book(db: Session, book_id: int, user_id: int) -> bool:
     
     db.delete(book)
     db.commit()
-    print(f"DEBUG: Deleted book {book_id} for user {user_id}")
+    logger.debug("Deleted book %s for user %s", book_id, user_id)
     return True
 
 
@@ -373,7 +376,7 @@ def update_book(
     db.commit()
     db.refresh(book)
     
-    print(f"DEBUG: Updated book {book_id} for user {user_id}")
+    logger.debug("Updated book %s for user %s", book_id, user_id)
     return book
 
 
@@ -4,9 +4,12 @@ Database configuration and session management
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import logging
 import os
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # Use volume path from Railway or Fly.io, otherwise local directory
 # Railway uses RAILWAY_VOLUME_MOUNT_PATH, Fly.io uses DATABASE_PATH
 BASE_DIR = os.getenv("RAILWAY_VOLUME_MOUNT_PATH") or os.getenv("DATABASE_PATH", ".").rsplit("/", 1)[0] if "/" in os.getenv("DATABASE_PATH", ".") else "."
@@ -43,4 +46,4 @@ def init_db():
     """Initialize database tables"""
     from models import User, Recipe, UserRecipe, Book, BookRecipe
     Base.metadata.create_all(bind=engine)
-    print("DEBUG: Database tables created successfully")
\ No newline at end of file
+    logger.debug("Database tables created successfully")
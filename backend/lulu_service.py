@@ -6,9 +6,12 @@ Handles authentication, cost calculation, print job creation, and order tracking
 import os
 import time
 from typing import Dict, Optional, List
+import logging
 import requests
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # Lulu API Configuration
@@ -25,6 +28,10 @@ DEFAULT_POD_PACKAGE_ID = "0600X0900BWSTDPB060UW444MXX"  # 6x9 B&W perfect bindin
 # Token cache
 _token_cache: Optional[Dict] = None
 
+# Shared session: the token request and the API calls that follow reuse one
+# keep-alive connection instead of a new TCP+TLS handshake per request
+_session = requests.Session()
+
 
 class LuluAPIError(Exception):
     """Custom exception for Lulu API errors"""
@@ -46,10 +53,10 @@ def _get_auth_token() -> str:
     if not LULU_CLIENT_KEY or not LULU_CLIENT_SECRET:
         raise LuluAPIError("Lulu API credentials not configured. Set LULU_CLIENT_KEY and LULU_CLIENT_SECRET in .env")
     
-    print(f"DEBUG: Requesting new Lulu API token from {LULU_AUTH_URL}")
+    logger.debug("Requesting new Lulu API token from %s", LULU_AUTH_URL)
     
     try:
-        response = requests.post(
+        response = _session.post(
             LULU_AUTH_URL,
             data={
                 "grant_type": "client_credentials"
@@ -70,7 +77,7 @@ def _get_auth_token() -> str:
             "expires_at": time.time() + token_data.get("expires_in", 3600)
         }
         
-        print(f"DEBUG: Successfully obtained Lulu API token (expires in {token_data.get('expires_in', 3600)}s)")
+        logger.debug("Successfully obtained Lulu API token (expires in %ss)", token_data.get('expires_in', 3600))
         return _token_cache["access_token"]
         
     except requests.exceptions.RequestException as e:
@@ -100,9 +107,9 @@ def _make_api_request(method: str, endpoint: str, data: Optional[Dict] = None) -
     
     try:
         if method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _session.get(url, headers=headers, timeout=30)
         elif method.upper() == "POST":
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            response = _session.post(url, headers=headers, json=data, timeout=30)
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
         
@@ -150,7 +157,7 @@ def get_cost_calculation(
             "line_item_costs": [...]
         }
     """
-    print(f"DEBUG: Calculating cost for {quantity}x {page_count}-page book (SKU: {pod_package_id})")
+    logger.debug("Calculating cost for %sx %s-page book (SKU: %s)", quantity, page_count, pod_package_id)
     
     payload = {
         "line_items": [
@@ -165,7 +172,7 @@ def get_cost_calculation(
     }
     
     result = _make_api_request("POST", "/print-job-cost-calculations/", payload)
-    print(f"DEBUG: Cost calculation result: {result}")
+    logger.debug("Cost calculation result: %s", result)
     return result
 
 
@@ -199,9 +206,9 @@ def create_print_job(
     Returns:
         Dict with print job details including id, status, etc.
     """
-    print(f"DEBUG: Creating print job for '{title}' ({page_count} pages)")
-    print(f"DEBUG: Interior URL: {interior_url}")
-    print(f"DEBUG: Cover URL: {cover_url}")
+    logger.debug("Creating print job for '%s' (%s pages)", title, page_count)
+    logger.debug("Interior URL: %s", interior_url)
+    logger.debug("Cover URL: %s", cover_url)
     
     payload = {
         "contact_email": contact_email,
@@ -228,7 +235,7 @@ def create_print_job(
         payload["external_id"] = external_id
     
     result = _make_api_request("POST", "/print-jobs/", payload)
-    print(f"DEBUG: Print job created successfully. Job ID: {result.get('id')}")
+    logger.debug("Print job created successfully. Job ID: %s", result.get('id'))
     return result
 
 
@@ -249,11 +256,11 @@ def get_print_job_status(job_id: int) -> Dict:
             ...
         }
     """
-    print(f"DEBUG: Fetching status for print job {job_id}")
+    logger.debug("Fetching status for print job %s", job_id)
     result = _make_api_request("GET", f"/print-jobs/{job_id}/")
     
     status_name = result.get("status", {}).get("name", "UNKNOWN")
-    print(f"DEBUG: Print job {job_id} status: {status_name}")
+    logger.debug("Print job %s status: %s", job_id, status_name)
     
     return result
 
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks, Depends
+import asyncio
+from fastapi import FastAPI, HTTPException, Query, BackgroundTasks, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, Response, RedirectResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -6,6 +7,7 @@ from pydantic import BaseModel
 import os
 from typing import Optional, List, Dict
 import io
+import logging
 import secrets
 import time
 from pathlib import Path
@@ -17,16 +19,37 @@ import os
 if os.path.exists('.env'):
     load_dotenv()
 
+# App modules log through the logging module to stderr: INFO and above by
+# default, everything when DEBUG=true. Debug messages use %-style arguments, so
+# they are not even formatted unless DEBUG is on.
+logger = logging.getLogger(__name__)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+_log_level = logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO
+for _logger_name in (
+    __name__, "services", "cache_manager", "semantic_cache", "pdf_service",
+    "auth", "crud", "database", "lulu_service",
+):
+    logging.getLogger(_logger_name).addHandler(_log_handler)
+    logging.getLogger(_logger_name).setLevel(_log_level)
+
 # Now import services after .env is loaded
 from services import (
-    get_video_metadata,
-    get_transcript,
-    extract_recipe_gemini,
+    get_video_id,
+    afetch_video_inputs,
+    afetch_validated_inputs,
+    aget_video_metadata,
+    aextract_recipe_gemini,
+    aextract_recipe_gemini_from_video,
+    RECIPE_FROM_VIDEO_ENABLED,
+    aextract_timestamps_gemini,
     extract_timestamps_gemini,
     extract_best_frame,
+    extract_best_frame_bytes,
     validate_is_recipe_video
 )
 import pdf_service
+import cache_manager
 import database
 import models
 import crud
@@ -37,27 +60,37 @@ database.init_db()
 
 app = FastAPI(title="Recipe Extract API")
 
+# Content-addressed cache entries (prompt/input hash keyed) older than this are
+# swept daily; 0 disables the sweep
+CACHE_SWEEP_MAX_AGE_DAYS = int(os.getenv("CACHE_SWEEP_MAX_AGE_DAYS", "30"))
+
+
+async def sweep_cache_periodically():
+    """Bound the size of the hash-keyed caches, which otherwise only grow"""
+    while True:
+        try:
+            await asyncio.to_thread(cache_manager.sweep, CACHE_SWEEP_MAX_AGE_DAYS)
+        except Exception as e:
+            logger.warning("Cache sweep failed: %s", e)
+        await asyncio.sleep(24 * 3600)
+
+
+@app.on_event("startup")
+async def start_cache_sweep():
+    if CACHE_SWEEP_MAX_AGE_DAYS > 0:
+        # Keep a reference so the task is not garbage collected
+        app.state.cache_sweep_task = asyncio.create_task(sweep_cache_periodically())
+
 
 async def generate_pdf_background(video_id: str, force_regenerate: bool = False):
     """Background task to generate PDF after visuals are complete"""
-    print(f"========================================")
-    print(f"BACKGROUND TASK STARTED: PDF generation for {video_id}")
-    print(f"========================================")
+    logger.info("[%s] Background PDF generation started (force_regenerate=%s)", video_id, force_regenerate)
     try:
-        print(f"[{video_id}] Generating PDF (force_regenerate={force_regenerate})...")
         await pdf_service.generate_or_load_pdf(video_id, force_regenerate=force_regenerate)
-        print(f"[{video_id}] PDF generation completed successfully")
-        print(f"========================================")
-        print(f"BACKGROUND TASK COMPLETED: PDF generation for {video_id}")
-        print(f"========================================")
-    except Exception as e:
-        import traceback
+        logger.info("[%s] Background PDF generation completed", video_id)
+    except Exception:
         # Log error but don't crash - PDF generation is not critical
-        print(f"========================================")
-        print(f"BACKGROUND TASK FAILED: PDF generation for {video_id}")
-        print(f"Error: {e}")
-        print(f"Traceback: {traceback.format_exc()}")
-        print(f"========================================")
+        logger.exception("[%s] Background PDF generation failed", video_id)
 
 # CORS middleware for frontend
 # Allow origins from environment variable, default to localhost for development
@@ -120,6 +153,87 @@ async def root():
 # In-memory storage for temporary PDF URLs (in production, use Redis or database)
 _pdf_url_cache: Dict[str, Dict] = {}
 
+def _request_video_id(url: str) -> str:
+    """Video ID of a request URL; unparseable URLs are a 400, not a 500"""
+    try:
+        return get_video_id(url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _ensure_recipe_video(validation_result: dict) -> None:
+    """Raise a 400 if recipe-video validation (validate_is_recipe_video) said no"""
+    if not validation_result.get("is_recipe", True):
+        # Not a recipe video - return error
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "not_recipe_video",
+                "message": "This video does not appear to be a recipe video",
+                "suggestion": "Please try a cooking tutorial or recipe video"
+            }
+        )
+
+
+async def _extract_recipe_for_url(url: str, force_regenerate: bool = False):
+    """
+    Fetch inputs, validate, and extract the recipe for a video URL.
+    With RECIPE_FROM_VIDEO_ENABLED, Gemini reads the video directly and the
+    transcript is only fetched if that fails.
+
+    Returns:
+        (metadata, recipe)
+    """
+    if RECIPE_FROM_VIDEO_ENABLED:
+        metadata = await aget_video_metadata(url)
+        # The Groq validation call blocks, so keep it off the event loop
+        _ensure_recipe_video(await asyncio.to_thread(validate_is_recipe_video, metadata, url))
+        try:
+            recipe = await aextract_recipe_gemini_from_video(url, metadata, force_regenerate=force_regenerate)
+            return metadata, recipe
+        except Exception as e:
+            logger.debug("Recipe extraction from video failed, falling back to transcript: %s", e)
+
+    # Get metadata and transcript, validating while the subtitles download
+    # Note: get_transcript returns empty list if no transcript available
+    if RECIPE_FROM_VIDEO_ENABLED:
+        # Already validated above
+        metadata, transcript = await afetch_video_inputs(url)
+    else:
+        metadata, transcript, validation_result = await afetch_validated_inputs(url)
+        _ensure_recipe_video(validation_result)
+
+    # Stop if no transcript available
+    if not transcript:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "no_transcript",
+                "message": "This video does not have a transcript available",
+                "suggestion": "Please try a video with English subtitles or captions enabled"
+            }
+        )
+
+    # Combine into input JSON
+    input_data = {
+        "title": metadata.get("title"),
+        "description": metadata.get("description"),
+        "transcript": transcript  # Transcript is guaranteed to exist at this point
+    }
+
+    # Extract recipe using Gemini
+    recipe = await aextract_recipe_gemini(input_data, url, force_regenerate=force_regenerate)
+    return metadata, recipe
+
+
+def _file_mtime(path: Path, default: Optional[float] = None) -> Optional[float]:
+    """A file's mtime, or default if it does not exist (one stat instead of exists() + stat())"""
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return default
+
+
 def create_public_pdf_url(book_id: int, pdf_bytes: bytes) -> str:
     """
     Create a temporary public URL for a PDF.
@@ -211,7 +325,7 @@ async def get_current_user_info(
             "created_at": current_user.created_at
         }
     except Exception as e:
-        print(f"ERROR: Failed to fetch user from Clerk: {e}")
+        logger.error("Failed to fetch user from Clerk: %s", e)
         # Return minimal info if Clerk fetch fails
         return {
             "id": current_user.id,
@@ -232,50 +346,11 @@ async def extract_recipe(
     Extract structured recipe from YouTube URL.
     If authenticated, saves to user's collection.
     """
+    # Extract video ID from URL
+    video_id = _request_video_id(request.url)
     try:
-        # Extract video ID from URL
-        video_id = request.url.split("v=")[-1].split("&")[0]
-        
-        # Get metadata
-        metadata = get_video_metadata(request.url)
-        
-        # Validate if this is a recipe video using Gemma
-        validation_result = validate_is_recipe_video(metadata, request.url)
-        if not validation_result.get("is_recipe", True):
-            # Not a recipe video - return error
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "not_recipe_video",
-                    "message": "This video does not appear to be a recipe video",
-                    "suggestion": "Please try a cooking tutorial or recipe video"
-                }
-            )
-        
-        # Get transcript (only if validation passed)
-        # Note: get_transcript returns empty list if no transcript available
-        transcript = get_transcript(video_id)
-
-        # Stop if no transcript available
-        if not transcript:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "no_transcript",
-                    "message": "This video does not have a transcript available",
-                    "suggestion": "Please try a video with English subtitles or captions enabled"
-                }
-            )
-        
-        # Combine into input JSON
-        input_data = {
-            "title": metadata.get("title"),
-            "description": metadata.get("description"),
-            "transcript": transcript  # Transcript is guaranteed to exist at this point
-        }
-
-        # Extract recipe using Gemini
-        recipe = extract_recipe_gemini(input_data, request.url)
+        # Validate, then extract recipe using Gemini (from the video or its transcript)
+        metadata, recipe = await _extract_recipe_for_url(request.url)
 
         # Add video URL and channel info to recipe data
         recipe["video_url"] = request.url
@@ -321,10 +396,9 @@ async def save_recipe_to_collection(
     """
     Save a recipe to user's collection (extracts if needed)
     """
+    # Extract video ID
+    video_id = _request_video_id(request.url)
     try:
-        # Extract video ID
-        video_id = request.url.split("v=")[-1].split("&")[0]
-        
         # Check if recipe already exists in database
         db_recipe = crud.get_recipe_by_video_id(db, video_id)
         recipe_was_new = False
@@ -336,49 +410,13 @@ async def save_recipe_to_collection(
             recipe_cache_exists = (cache_manager.get_video_cache_dir(video_id) / "recipe.json").exists()
             if not recipe_cache_exists:
                 cache_cleared = True
-                print(f"[{video_id}] Cache was cleared - will regenerate recipe from scratch")
+                logger.info("[%s] Cache was cleared - will regenerate recipe from scratch", video_id)
         
         if not db_recipe or cache_cleared:
             # Recipe doesn't exist, need to extract it
             recipe_was_new = True
-            metadata = get_video_metadata(request.url)
-            
-            # Validate if this is a recipe video using Gemma
-            validation_result = validate_is_recipe_video(metadata, request.url)
-            if not validation_result.get("is_recipe", True):
-                # Not a recipe video - return error
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error": "not_recipe_video",
-                        "message": "This video does not appear to be a recipe video",
-                        "suggestion": "Please try a cooking tutorial or recipe video"
-                    }
-                )
-            
-            # Get transcript (only if validation passed)
-            # Note: get_transcript returns empty list if no transcript available
-            transcript = get_transcript(video_id)
-
-            # Stop if no transcript available
-            if not transcript:
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error": "no_transcript",
-                        "message": "This video does not have a transcript available",
-                        "suggestion": "Please try a video with English subtitles or captions enabled"
-                    }
-                )
-            
-            input_data = {
-                "title": metadata.get("title"),
-                "description": metadata.get("description"),
-                "transcript": transcript  # Transcript is guaranteed to exist at this point
-            }
-
-            # Extract recipe using Gemini (force regenerate if cache was cleared)
-            recipe_data = extract_recipe_gemini(input_data, request.url, force_regenerate=cache_cleared)
+            # Validate and extract recipe using Gemini (force regenerate if cache was cleared)
+            metadata, recipe_data = await _extract_recipe_for_url(request.url, force_regenerate=cache_cleared)
             recipe_data["video_url"] = request.url
             if metadata.get("channel_name"):
                 recipe_data["channel_name"] = metadata.get("channel_name")
@@ -392,7 +430,7 @@ async def save_recipe_to_collection(
                     db_recipe.channel_name = metadata.get("channel_name")
                 db.commit()
                 db.refresh(db_recipe)
-                print(f"[{video_id}] Updated database recipe after cache clear")
+                logger.info("[%s] Updated database recipe after cache clear", video_id)
             else:
                 # Create new recipe in database
                 db_recipe = crud.create_recipe(
@@ -413,33 +451,29 @@ async def save_recipe_to_collection(
         from pathlib import Path
         
         existing_image = cache_manager.load_frame(video_id, "dish_visual")
-        pdf_path = cache_manager.get_video_cache_dir(video_id) / "recipe.pdf"
-        existing_pdf = pdf_path.exists()
+        video_dir = cache_manager.get_video_cache_dir(video_id)
+        pdf_mtime = _file_mtime(video_dir / "recipe.pdf")
+        existing_pdf = pdf_mtime is not None
         
         # Check if PDF needs regeneration (if any pipeline part is missing or newer)
         pdf_needs_regeneration = False
         if existing_pdf:
-            pdf_mtime = pdf_path.stat().st_mtime if pdf_path.exists() else 0
             # Check if recipe, timestamps, or images are newer than PDF
-            recipe_path = cache_manager.get_video_cache_dir(video_id) / "recipe.json"
-            timestamps_path = cache_manager.get_video_cache_dir(video_id) / "timestamps.json"
-            image_path = cache_manager.get_video_cache_dir(video_id) / "frames" / "step_dish_visual.jpg"
-            
-            if recipe_path.exists() and recipe_path.stat().st_mtime > pdf_mtime:
+            if _file_mtime(video_dir / "recipe.json", 0) > pdf_mtime:
                 pdf_needs_regeneration = True
-                print(f"[{video_id}] PDF needs regeneration: recipe.json is newer")
-            elif timestamps_path.exists() and timestamps_path.stat().st_mtime > pdf_mtime:
+                logger.info("[%s] PDF needs regeneration: recipe.json is newer", video_id)
+            elif _file_mtime(video_dir / "timestamps.json", 0) > pdf_mtime:
                 pdf_needs_regeneration = True
-                print(f"[{video_id}] PDF needs regeneration: timestamps.json is newer")
-            elif image_path.exists() and image_path.stat().st_mtime > pdf_mtime:
+                logger.info("[%s] PDF needs regeneration: timestamps.json is newer", video_id)
+            elif _file_mtime(video_dir / "frames" / "step_dish_visual.jpg", 0) > pdf_mtime:
                 pdf_needs_regeneration = True
-                print(f"[{video_id}] PDF needs regeneration: dish_visual image is newer")
+                logger.info("[%s] PDF needs regeneration: dish_visual image is newer", video_id)
         elif not existing_pdf:
             # PDF doesn't exist, check if we have the required parts
-            recipe_exists = (cache_manager.get_video_cache_dir(video_id) / "recipe.json").exists()
+            recipe_exists = (video_dir / "recipe.json").exists()
             if recipe_exists:
                 pdf_needs_regeneration = True
-                print(f"[{video_id}] PDF needs regeneration: PDF missing but recipe exists")
+                logger.info("[%s] PDF needs regeneration: PDF missing but recipe exists", video_id)
         
         # Extract key steps from recipe for timestamp extraction
         # Try to get recipe_data from database first, then from cache as fallback
@@ -452,13 +486,13 @@ async def save_recipe_to_collection(
             if cached_recipe:
                 recipe_data = cached_recipe
         
-        print(f"[{video_id}] DEBUG: Recipe data keys: {list(recipe_data.keys()) if recipe_data else 'None'}")
+        logger.debug("[%s] Recipe data keys: %s", video_id, list(recipe_data.keys()) if recipe_data else 'None')
         
         key_steps = {}
         # Check for 'instructions' (plural) which is what the recipe extraction returns
         instructions = recipe_data.get("instructions", [])
         if instructions:
-            print(f"[{video_id}] DEBUG: Found {len(instructions)} instructions in recipe_data")
+            logger.debug("[%s] Found %s instructions in recipe_data", video_id, len(instructions))
             for i, instruction in enumerate(instructions, 1):
                 if isinstance(instruction, dict):
                     # Only include steps marked as key steps
@@ -473,10 +507,10 @@ async def save_recipe_to_collection(
                     instruction_text = str(instruction)
                     if instruction_text:
                         key_steps[str(i)] = instruction_text
-            print(f"[{video_id}] DEBUG: Extracted {len(key_steps)} key steps (marked as is_key_step): {list(key_steps.keys())}")
+            logger.debug("[%s] Extracted %s key steps (marked as is_key_step): %s", video_id, len(key_steps), list(key_steps.keys()))
         # Also check for 'steps' as fallback
         elif "steps" in recipe_data and recipe_data["steps"]:
-            print(f"[{video_id}] DEBUG: Found {len(recipe_data['steps'])} steps in recipe_data")
+            logger.debug("[%s] Found %s steps in recipe_data", video_id, len(recipe_data['steps']))
             for i, step in enumerate(recipe_data["steps"], 1):
                 if isinstance(step, dict):
                     # Only include steps marked as key steps
@@ -491,26 +525,22 @@ async def save_recipe_to_collection(
                     instruction_text = str(step)
                     if instruction_text:
                         key_steps[str(i)] = instruction_text
-            print(f"[{video_id}] DEBUG: Extracted {len(key_steps)} key steps (marked as is_key_step): {list(key_steps.keys())}")
+            logger.debug("[%s] Extracted %s key steps (marked as is_key_step): %s", video_id, len(key_steps), list(key_steps.keys()))
         else:
-            print(f"[{video_id}] DEBUG: No instructions/steps found in recipe_data. Available keys: {list(recipe_data.keys()) if recipe_data else 'None'}")
+            logger.debug("[%s] No instructions/steps found in recipe_data. Available keys: %s", video_id, list(recipe_data.keys()) if recipe_data else 'None')
         
         # Schedule image extraction if missing
         if not existing_image:
             if key_steps:
                 try:
-                    print(f"========================================")
-                    print(f"SCHEDULING: Background image extraction for {video_id}")
-                    print(f"Reason: Image missing, {len(key_steps)} steps available")
-                    print(f"========================================")
                     background_tasks.add_task(extract_recipe_images_background, request.url, key_steps, video_id)
-                    print(f"[{video_id}] ✓ Background image extraction task scheduled")
+                    logger.info("[%s] Scheduled background image extraction (image missing, %s steps available)", video_id, len(key_steps))
                 except Exception as e:
-                    print(f"[{video_id}] ✗ Failed to schedule background image task: {e}")
+                    logger.error("[%s] Failed to schedule background image task: %s", video_id, e)
             else:
-                print(f"[{video_id}] ⚠ Skipping image extraction: No key steps available")
+                logger.warning("[%s] Skipping image extraction: No key steps available", video_id)
         else:
-            print(f"[{video_id}] ✓ Image already exists, skipping extraction")
+            logger.debug("[%s] Image already exists, skipping extraction", video_id)
         
         # Schedule PDF generation if missing or needs regeneration
         # Also regenerate if recipe was just extracted (recipe_was_new=True)
@@ -522,18 +552,14 @@ async def save_recipe_to_collection(
                     reason = "PDF missing"
                 else:
                     reason = "Pipeline parts updated"
-                print(f"========================================")
-                print(f"SCHEDULING: Background PDF generation for {video_id}")
-                print(f"Reason: {reason}")
-                print(f"========================================")
                 # Force regeneration if PDF exists but is outdated, or if recipe was just extracted
                 force_regenerate = (existing_pdf and pdf_needs_regeneration) or recipe_was_new
                 background_tasks.add_task(generate_pdf_background, video_id, force_regenerate)
-                print(f"[{video_id}] ✓ Background PDF generation task scheduled (force_regenerate={force_regenerate})")
+                logger.info("[%s] Scheduled background PDF generation (%s, force_regenerate=%s)", video_id, reason, force_regenerate)
             except Exception as e:
-                print(f"[{video_id}] ✗ Failed to schedule background PDF task: {e}")
+                logger.error("[%s] Failed to schedule background PDF task: %s", video_id, e)
         else:
-            print(f"[{video_id}] ✓ PDF already exists and is up-to-date, skipping generation")
+            logger.debug("[%s] PDF already exists and is up-to-date, skipping generation", video_id)
         
         # Add to user's collection (or return success if already exists)
         response_recipe = db_recipe.recipe_data.copy() if db_recipe.recipe_data else {}
@@ -558,9 +584,7 @@ async def save_recipe_to_collection(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"ERROR: Failed to save recipe to collection: {e}")
-        print(f"ERROR: Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to save recipe to collection")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -568,44 +592,38 @@ def extract_recipe_images_background(video_url: str, key_steps: dict, video_id:
     """
     Background task to extract recipe images (timestamps and dish_visual frame)
     """
-    print(f"========================================")
-    print(f"BACKGROUND TASK STARTED: Image extraction for {video_id}")
-    print(f"Video URL: {video_url}")
-    print(f"Key steps count: {len(key_steps)}")
-    print(f"========================================")
+    logger.info("[%s] Background image extraction started (%s key steps)", video_id, len(key_steps))
     
-    try:
-        print(f"[{video_id}] STEP 1: Getting timestamps from Gemini...")
-        timestamps = extract_timestamps_gemini(video_url, key_steps)
-        print(f"[{video_id}] STEP 1 COMPLETE: Got timestamps: {list(timestamps.keys())}")
+    def extract_dish_visual(timestamps: dict):
+        logger.debug("[%s] STEP 1 COMPLETE: Got timestamps: %s", video_id, list(timestamps.keys()))
         
         # Extract ONLY the dish_visual frame (hero image)
         if "dish_visual" in timestamps and timestamps["dish_visual"] and timestamps["dish_visual"] != "null":
-            print(f"[{video_id}] STEP 2: Extracting dish_visual frame at timestamp {timestamps['dish_visual']}...")
-            result = extract_best_frame(
+            logger.debug("[%s] STEP 2: Extracting dish_visual frame at timestamp %s...", video_id, timestamps['dish_visual'])
+            # Only the cached file is needed here, so skip the base64 encode
+            result = extract_best_frame_bytes(
                 video_url,
                 timestamps["dish_visual"],
                 "Visual reference",
                 "dish_visual"  # cache key
             )
             if result:
-                print(f"[{video_id}] STEP 2 COMPLETE: Successfully extracted and saved dish_visual frame")
+                logger.debug("[%s] STEP 2 COMPLETE: Successfully extracted and saved dish_visual frame", video_id)
             else:
-                print(f"[{video_id}] STEP 2 FAILED: extract_best_frame returned None")
+                logger.warning("[%s] STEP 2 FAILED: extract_best_frame_bytes returned None", video_id)
         else:
-            print(f"[{video_id}] STEP 2 SKIPPED: No dish_visual timestamp found in {timestamps}")
+            logger.debug("[%s] STEP 2 SKIPPED: No dish_visual timestamp found in %s", video_id, timestamps)
+    
+    try:
+        logger.debug("[%s] STEP 1: Getting timestamps from Gemini...", video_id)
+        # Frame extraction starts as soon as timestamps arrive, overlapping the
+        # dish description generation
+        extract_timestamps_gemini(video_url, key_steps, on_timestamps=extract_dish_visual)
         
-        print(f"========================================")
-        print(f"BACKGROUND TASK COMPLETED: Image extraction for {video_id}")
-        print(f"========================================")
+        logger.info("[%s] Background image extraction completed", video_id)
             
-    except Exception as e:
-        import traceback
-        print(f"========================================")
-        print(f"BACKGROUND TASK FAILED: Image extraction for {video_id}")
-        print(f"Error: {e}")
-        print(f"Traceback: {traceback.format_exc()}")
-        print(f"========================================")
+    except Exception:
+        logger.exception("[%s] Background image extraction failed", video_id)
 
 
 @app.get("/api/recipes")
@@ -617,28 +635,31 @@ async def get_user_recipes(
     Get all recipes in user's collection
     """
     try:
-        print(f"DEBUG: Getting recipes for user_id={current_user.id}, clerk_id={current_user.clerk_id}")
+        logger.debug("Getting recipes for user_id=%s, clerk_id=%s", current_user.id, current_user.clerk_id)
         recipes = crud.get_user_recipes(db, current_user.id)
-        print(f"DEBUG: Found {len(recipes)} recipes for user_id={current_user.id}")
-        
-        # Debug: Check user_recipes table directly
-        user_recipes_count = db.query(models.UserRecipe).filter(
-            models.UserRecipe.user_id == current_user.id
-        ).count()
-        print(f"DEBUG: UserRecipe associations found: {user_recipes_count}")
-        
-        # Debug: Check all recipes in database
-        all_recipes_count = db.query(models.Recipe).count()
-        print(f"DEBUG: Total recipes in database: {all_recipes_count}")
-        
-        # Debug: Check all users in database
-        all_users = db.query(models.User).all()
-        print(f"DEBUG: Total users in database: {len(all_users)}")
-        for user in all_users:
-            user_recipe_count = db.query(models.UserRecipe).filter(
-                models.UserRecipe.user_id == user.id
+        logger.debug("Found %s recipes for user_id=%s", len(recipes), current_user.id)
+        
+        # The diagnostics below cost one query per user, so only run them when
+        # they will be logged
+        if logger.isEnabledFor(logging.DEBUG):
+            # Debug: Check user_recipes table directly
+            user_recipes_count = db.query(models.UserRecipe).filter(
+                models.UserRecipe.user_id == current_user.id
             ).count()
-            print(f"DEBUG: User {user.id} (clerk_id={user.clerk_id}) has {user_recipe_count} recipes")
+            logger.debug("UserRecipe associations found: %s", user_recipes_count)
+            
+            # Debug: Check all recipes in database
+            all_recipes_count = db.query(models.Recipe).count()
+            logger.debug("Total recipes in database: %s", all_recipes_count)
+            
+            # Debug: Check all users in database
+            all_users = db.query(models.User).all()
+            logger.debug("Total users in database: %s", len(all_users))
+            for user in all_users:
+                user_recipe_count = db.query(models.UserRecipe).filter(
+                    models.UserRecipe.user_id == user.id
+                ).count()
+                logger.debug("User %s (clerk_id=%s) has %s recipes", user.id, user.clerk_id, user_recipe_count)
         
         return {
             "recipes": [
@@ -655,9 +676,7 @@ async def get_user_recipes(
             ]
         }
     except Exception as e:
-        import traceback
-        print(f"ERROR: Failed to get user recipes: {e}")
-        print(f"ERROR: Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to get user recipes")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -876,14 +895,29 @@ async def extract_visuals(
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Extract timestamps and best frame for dish visual only"""
+    video_id = _request_video_id(request.url)
     try:
-        video_id = request.url.split("v=")[-1].split("&")[0]
+        # Only extract the dish_visual frame (hero image)
+        # Skip extracting individual step frames to save time and bandwidth.
+        # It starts as soon as timestamps arrive, overlapping the dish
+        # description generation
+        dish_visual_frame = {}
+
+        def extract_dish_visual(timestamps: dict):
+            if "dish_visual" in timestamps and timestamps["dish_visual"] and timestamps["dish_visual"] != "null":
+                logger.debug("Extracting dish_visual frame only...")
+                dish_visual_frame["frame_base64"] = extract_best_frame(
+                    request.url,
+                    timestamps["dish_visual"],
+                    "Visual reference",
+                    "dish_visual"  # cache key
+                )
 
         # Get timestamps from Gemini (analyzes video to find key moments)
-        timestamps = extract_timestamps_gemini(request.url, request.key_steps)
+        timestamps = await aextract_timestamps_gemini(
+            request.url, request.key_steps, on_timestamps=extract_dish_visual
+        )
 
-        # Only extract the dish_visual frame (hero image)
-        # Skip extracting individual step frames to save time and bandwidth
         results = {}
         
         # Return timestamps for all steps (for future reference)
@@ -893,18 +927,10 @@ async def extract_visuals(
                 "frame_base64": None  # Don't extract frames for individual steps
             }
         
-        # Extract ONLY the dish_visual frame
-        if "dish_visual" in timestamps and timestamps["dish_visual"] and timestamps["dish_visual"] != "null":
-            print("DEBUG: Extracting dish_visual frame only...")
-            best_frame_data = extract_best_frame(
-                request.url,
-                timestamps["dish_visual"],
-                "Visual reference",
-                "dish_visual"  # cache key
-            )
+        if "frame_base64" in dish_visual_frame:
             results["dish_visual"] = {
                 "timestamp": timestamps["dish_visual"],
-                "frame_base64": best_frame_data
+                "frame_base64": dish_visual_frame["frame_base64"]
             }
 
         # Schedule PDF generation in background (non-blocking)
@@ -955,36 +981,28 @@ async def get_cached_recipe(video_id: str, regenerate: bool = Query(False, descr
         if not recipe:
             if regenerate:
                 # Try to regenerate the recipe
-                print(f"DEBUG: Recipe not found in cache for video {video_id}, attempting to regenerate...")
+                logger.debug("Recipe not found in cache for video %s, attempting to regenerate...", video_id)
                 try:
                     video_url = f"https://www.youtube.com/watch?v={video_id}"
                     
-                    # Get metadata and transcript
-                    if not metadata:
-                        print(f"DEBUG: Fetching metadata for video {video_id}")
-                        metadata = get_video_metadata(video_url)
-                        cache_manager.save_step(video_id, "metadata", metadata)
-                    
-                    transcript = cache_manager.load_step(video_id, "transcript")
-                    if not transcript:
-                        print(f"DEBUG: Fetching transcript for video {video_id}")
-                        transcript = get_transcript(video_id)
-                        cache_manager.save_step(video_id, "transcript", transcript)
+                    # Get metadata and transcript (cache-first, one yt-dlp call if neither is cached)
+                    logger.debug("Fetching metadata and transcript for video %s", video_id)
+                    metadata, transcript = await afetch_video_inputs(video_url)
                     
                     # Extract recipe
-                    print(f"DEBUG: Extracting recipe for video {video_id}")
+                    logger.debug("Extracting recipe for video %s", video_id)
                     input_data = {
                         "metadata": metadata,
                         "transcript": transcript
                     }
-                    recipe = extract_recipe_gemini(input_data, video_url)
-                    print(f"DEBUG: Successfully regenerated recipe for video {video_id}")
+                    recipe = await aextract_recipe_gemini(input_data, video_url)
+                    logger.debug("Successfully regenerated recipe for video %s", video_id)
                     
                     # Reload status after regeneration
                     status = cache_manager.get_pipeline_status(video_id)
                     
                 except Exception as e:
-                    print(f"ERROR: Failed to regenerate recipe for video {video_id}: {e}")
+                    logger.error("Failed to regenerate recipe for video %s: %s", video_id, e)
                     raise HTTPException(
                         status_code=500, 
                         detail=f"Recipe not found in cache and regeneration failed: {str(e)}"
@@ -1025,26 +1043,36 @@ async def clear_video_cache(video_id: str):
 
 
 @app.get("/api/cache/{video_id}/image")
-async def get_recipe_image(video_id: str):
+async def get_recipe_image(video_id: str, accept: Optional[str] = Header(None)):
     """
     Get the dish_visual image for a recipe.
-    Returns the image as JPEG if available, otherwise 404.
+    Returns the image as WebP to browsers that accept it, otherwise as JPEG;
+    404 if there is no image.
     """
     import cache_manager
     from fastapi.responses import Response
     
     try:
         # Load the dish_visual frame
-        frame_data = cache_manager.load_frame(video_id, "dish_visual")
+        frame_data = None
+        media_type = "image/jpeg"
+        if accept and "image/webp" in accept:
+            # None when the frame cannot be converted; the JPEG is served instead
+            frame_data = await asyncio.to_thread(cache_manager.load_frame_webp, video_id, "dish_visual")
+            media_type = "image/webp"
+        if frame_data is None:
+            frame_data = cache_manager.load_frame(video_id, "dish_visual")
+            media_type = "image/jpeg"
         
         if not frame_data:
             raise HTTPException(status_code=404, detail="Recipe image not found")
         
         return Response(
             content=frame_data,
-            media_type="image/jpeg",
+            media_type=media_type,
             headers={
-                "Cache-Control": "public, max-age=31536000"  # Cache for 1 year
+                "Cache-Control": "public, max-age=31536000",  # Cache for 1 year
+                "Vary": "Accept",
             }
         )
         
@@ -1222,19 +1250,19 @@ async def create_print_order(
             raise HTTPException(status_code=400, detail=str(e))
         
         # Generate book PDF
-        print(f"DEBUG: Generating PDF for book {book_id}")
+        logger.debug("Generating PDF for book %s", book_id)
         pdf_bytes = await pdf_service.generate_book_pdf(book_data)
         
         # Create public URL for Lulu to access
         public_url = create_public_pdf_url(book_id, pdf_bytes)
-        print(f"DEBUG: Created public PDF URL: {public_url}")
+        logger.debug("Created public PDF URL: %s", public_url)
         
         # Calculate page count
         recipe_count = len(book_data["recipes"])
         estimated_page_count = 3 + (recipe_count * 2)
         
         # Create print job with Lulu
-        print(f"DEBUG: Submitting print job to Lulu")
+        logger.debug("Submitting print job to Lulu")
         lulu_job = lulu_service.create_print_job(
             interior_url=public_url,
             cover_url=public_url,  # Same PDF for now
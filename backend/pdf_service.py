@@ -4,6 +4,10 @@ Generates recipe PDFs from cached data using Playwright for HTML→PDF conversio
 """
 
 import base64
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -12,6 +16,8 @@ from playwright.async_api import async_playwright
 from pypdf import PdfReader, PdfWriter
 import cache_manager
 
+logger = logging.getLogger(__name__)
+
 
 # Setup Jinja2 environment
 TEMPLATES_DIR = Path(__file__).parent / "templates"
@@ -65,11 +71,27 @@ def get_hero_image_data_uri(video_id: str) -> Optional[str]:
     return None
 
 
+def _encode_frame(frame_file: Path) -> Optional[tuple]:
+    """Read a cached step frame and return (step_key, data_uri), or None if unreadable"""
+    step_key = frame_file.stem.replace("step_", "")  # e.g., "12", "14", etc.
+    try:
+        frame_data = frame_file.read_bytes()
+    except OSError:
+        return None
+    if not frame_data:
+        return None
+    # Build the URI in one buffer to avoid an intermediate base64 str copy
+    buf = bytearray(b"data:image/jpeg;base64,")
+    buf += base64.b64encode(frame_data)
+    return step_key, buf.decode('ascii')
+
+
 def get_step_images_data_uris(video_id: str) -> dict:
     """
     Load all step frames and convert to data URIs.
     Note: Currently we only extract dish_visual, not individual step images.
     This function is kept for future compatibility if step images are re-enabled.
+    Frames are read and encoded on a small thread pool since the work is disk-bound.
     """
     step_images = {}
     video_dir = cache_manager.get_video_cache_dir(video_id)
@@ -78,52 +100,94 @@ def get_step_images_data_uris(video_id: str) -> dict:
     if not frames_dir.exists():
         return step_images
     
-    # Get all step frame files (excluding dish_visual)
-    for frame_file in frames_dir.glob("step_*.jpg"):
-        # Skip dish_visual as it's used for hero image
-        if frame_file.stem == "step_dish_visual":
-            continue
-            
-        step_key = frame_file.stem.replace("step_", "")  # e.g., "12", "14", etc.
-        frame_data = cache_manager.load_frame(video_id, step_key)
-        if frame_data:
-            base64_data = base64.b64encode(frame_data).decode('utf-8')
-            step_images[step_key] = f"data:image/jpeg;base64,{base64_data}"
+    # Get all step frame files (excluding dish_visual, which is used for the hero image)
+    frame_files = [
+        frame_file for frame_file in frames_dir.glob("step_*.jpg")
+        if frame_file.stem != "step_dish_visual"
+    ]
+    if not frame_files:
+        return step_images
+
+    with ThreadPoolExecutor(max_workers=min(8, len(frame_files))) as executor:
+        for result in executor.map(_encode_frame, frame_files):
+            if result:
+                step_key, data_uri = result
+                step_images[step_key] = data_uri
     
     return step_images
 
 
+# Videos whose dish_visual frame is known to exist, least recently used first.
+# Only positive results are kept, so a hero written later is picked up without
+# invalidating anything; a stale hit is dropped for that one video.
+_HEROES_PRESENT_MAX = 1024
+_heroes_present: "OrderedDict[str, None]" = OrderedDict()
+_heroes_lock = threading.Lock()
+
+
+def _remember_hero(video_id: str) -> None:
+    """Record a known hero frame, evicting the least recently used past the cap"""
+    with _heroes_lock:
+        _heroes_present[video_id] = None
+        _heroes_present.move_to_end(video_id)
+        if len(_heroes_present) > _HEROES_PRESENT_MAX:
+            _heroes_present.popitem(last=False)
+
+
+def _forget_hero(video_id: str) -> None:
+    with _heroes_lock:
+        _heroes_present.pop(video_id, None)
+
+
+def _hero_exists(video_id: str) -> bool:
+    """Check for the cached dish_visual frame, memoizing only a hit"""
+    with _heroes_lock:
+        if video_id in _heroes_present:
+            _heroes_present.move_to_end(video_id)
+            return True
+    if (cache_manager.get_video_cache_dir(video_id) / "frames" / "step_dish_visual.jpg").exists():
+        _remember_hero(video_id)
+        return True
+    return False
+
+
 def ensure_hero_image(video_id: str, recipe: dict) -> Optional[str]:
     """
     Ensure we have a hero image; if missing, try to regenerate the dish_visual frame.
     """
-    hero_image = get_hero_image_data_uri(video_id)
-    if hero_image:
-        return hero_image
+    if _hero_exists(video_id):
+        hero_image = get_hero_image_data_uri(video_id)
+        if hero_image:
+            return hero_image
+        # Frame was removed since it was memoized (e.g. cache cleared)
+        _forget_hero(video_id)
 
     # Attempt regeneration using cached timestamps
     timestamps = cache_manager.load_step(video_id, "timestamps") or {}
     dish_timestamp = timestamps.get("dish_visual")
     if not dish_timestamp or dish_timestamp == "null":
-        print(f"DEBUG: No dish_visual timestamp available to regenerate hero image for {video_id}")
+        logger.debug("No dish_visual timestamp available to regenerate hero image for %s", video_id)
         return None
 
     # Build video URL (recipe cache may not contain it)
     video_url = recipe.get("video_url") or f"https://www.youtube.com/watch?v={video_id}"
 
     try:
-        from services import extract_best_frame  # Lazy import to avoid circular dependency
-        regenerated_base64 = extract_best_frame(
+        from services import extract_best_frame_bytes  # Lazy import to avoid circular dependency
+        regenerated_frame = extract_best_frame_bytes(
             video_url,
             dish_timestamp,
             "Visual reference",
             "dish_visual"
         )
-        if regenerated_base64:
-            print(f"DEBUG: Regenerated dish_visual frame for {video_id}")
-            return f"data:image/jpeg;base64,{regenerated_base64}"
+        if regenerated_frame:
+            _remember_hero(video_id)
+            logger.debug("Regenerated dish_visual frame for %s", video_id)
+            buf = bytearray(b"data:image/jpeg;base64,")
+            buf += base64.b64encode(regenerated_frame)
+            return buf.decode('ascii')
     except Exception as e:
-        print(f"DEBUG: Failed to regenerate hero image for {video_id}: {e}")
+        logger.debug("Failed to regenerate hero image for %s: %s", video_id, e)
 
     return None
 
@@ -138,7 +202,7 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
         - first_page_instructions: list of instruction indices for first page
         - overflow_instructions: list of instruction indices for overflow pages
     """
-    print("DEBUG: Measuring content heights...")
+    logger.debug("Measuring content heights...")
     
     # A4 page dimensions in pixels at 96 DPI
     PAGE_HEIGHT = 1123  # 297mm at 96 DPI
@@ -153,7 +217,7 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
         }
     """)
     
-    print(f"DEBUG: Ingredients column height: {ingredients_height}px, Available: {AVAILABLE_HEIGHT}px")
+    logger.debug("Ingredients column height: %spx, Available: %spx", ingredients_height, AVAILABLE_HEIGHT)
     
     # Check if ingredients overflow
     ingredients_overflow = ingredients_height > AVAILABLE_HEIGHT
@@ -167,7 +231,7 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
     }
     
     if ingredients_overflow:
-        print("DEBUG: Ingredients overflow detected, measuring split point...")
+        logger.debug("Ingredients overflow detected, measuring split point...")
         
         # Measure header heights separately
         header_height = await page.evaluate("""
@@ -189,7 +253,7 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
             }
         """)
         
-        print(f"DEBUG: Header height: {header_height}px, Ingredient items: {len(ingredient_heights)}")
+        logger.debug("Header height: %spx, Ingredient items: %s", header_height, len(ingredient_heights))
         
         # Find split point for ingredients
         # We need to find where to split so left column doesn't overflow
@@ -213,7 +277,7 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
         split_data['left_column_ingredients'] = list(range(ingredient_split))
         split_data['right_column_ingredients'] = list(range(ingredient_split, len(recipe['ingredients'])))
         
-        print(f"DEBUG: Split ingredients at index {ingredient_split} (total ingredients: {len(recipe['ingredients'])}, left: {len(split_data['left_column_ingredients'])}, right: {len(split_data['right_column_ingredients'])})")
+        logger.debug("Split ingredients at index %s (total ingredients: %s, left: %s, right: %s)", ingredient_split, len(recipe['ingredients']), len(split_data['left_column_ingredients']), len(split_data['right_column_ingredients']))
         
         # Calculate actual height of overflow ingredients
         # Sum up the heights of items after the split point
@@ -234,12 +298,12 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
         overflow_container_height = overflow_height + 80 + 40  # title + padding
         remaining_right_column_height = AVAILABLE_HEIGHT - overflow_container_height
         
-        print(f"DEBUG: Overflow ingredients height: {overflow_height}px, Container: {overflow_container_height}px, Remaining: {remaining_right_column_height}px")
+        logger.debug("Overflow ingredients height: %spx, Container: %spx, Remaining: %spx", overflow_height, overflow_container_height, remaining_right_column_height)
         
     else:
         # No ingredient overflow, full right column available for instructions
         remaining_right_column_height = AVAILABLE_HEIGHT
-        print("DEBUG: No ingredient overflow, full right column available")
+        logger.debug("No ingredient overflow, full right column available")
     
     # Measure instruction heights to see how many fit in remaining space
     instruction_heights = await page.evaluate("""
@@ -267,7 +331,7 @@ async def measure_content_and_split(page, recipe: dict) -> dict:
     split_data['first_page_instructions'] = list(range(instruction_split))
     split_data['overflow_instructions'] = list(range(instruction_split, len(recipe['instructions'])))
     
-    print(f"DEBUG: Instructions split - First page: {instruction_split}, Overflow: {len(recipe['instructions']) - instruction_split}")
+    logger.debug("Instructions split - First page: %s, Overflow: %s", instruction_split, len(recipe['instructions']) - instruction_split)
     
     return split_data
 
@@ -287,42 +351,33 @@ async def generate_recipe_pdf(video_id: str) -> bytes:
         ValueError: If recipe data not found and cannot be regenerated
         Exception: If PDF generation fails
     """
-    print(f"DEBUG: Generating PDF for video {video_id}")
+    logger.debug("Generating PDF for video %s", video_id)
     
     # Load cached data
     recipe = cache_manager.load_step(video_id, "recipe")
     if not recipe:
-        print(f"DEBUG: Recipe not found in cache for video {video_id}, attempting to regenerate...")
+        logger.debug("Recipe not found in cache for video %s, attempting to regenerate...", video_id)
         # Try to regenerate the recipe from the video
         try:
-            from services import get_video_metadata, get_transcript, extract_recipe_gemini
+            from services import fetch_video_inputs, extract_recipe_gemini
             
             video_url = f"https://www.youtube.com/watch?v={video_id}"
             
-            # Get metadata and transcript
-            metadata = cache_manager.load_step(video_id, "metadata")
-            if not metadata:
-                print(f"DEBUG: Fetching metadata for video {video_id}")
-                metadata = get_video_metadata(video_url)
-                cache_manager.save_step(video_id, "metadata", metadata)
-            
-            transcript = cache_manager.load_step(video_id, "transcript")
-            if not transcript:
-                print(f"DEBUG: Fetching transcript for video {video_id}")
-                transcript = get_transcript(video_id)
-                cache_manager.save_step(video_id, "transcript", transcript)
+            # Get metadata and transcript (cache-first, one yt-dlp call if neither is cached)
+            logger.debug("Fetching metadata and transcript for video %s", video_id)
+            metadata, transcript = fetch_video_inputs(video_url)
             
             # Extract recipe
-            print(f"DEBUG: Extracting recipe for video {video_id}")
+            logger.debug("Extracting recipe for video %s", video_id)
             input_data = {
                 "metadata": metadata,
                 "transcript": transcript
             }
             recipe = extract_recipe_gemini(input_data, video_url)
-            print(f"DEBUG: Successfully regenerated recipe for video {video_id}")
+            logger.debug("Successfully regenerated recipe for video %s", video_id)
             
         except Exception as e:
-            print(f"ERROR: Failed to regenerate recipe for video {video_id}: {e}")
+            logger.error("Failed to regenerate recipe for video %s: %s", video_id, e)
             raise ValueError(f"Recipe not found in cache for video {video_id} and regeneration failed: {str(e)}")
     
     metadata = cache_manager.load_step(video_id, "metadata")
@@ -343,17 +398,17 @@ async def generate_recipe_pdf(video_id: str) -> bytes:
         split_data=None  # Initial render without splits
     )
     
-    print("DEBUG: Rendered initial HTML template for measurement")
+    logger.debug("Rendered initial HTML template for measurement")
     
     # Generate PDF using Playwright
     try:
         async with async_playwright() as p:
-            print("DEBUG: Launching browser...")
+            logger.debug("Launching browser...")
             browser = await p.chromium.launch()
             page = await browser.new_page()
             
             # Set content and wait for fonts/images to load
-            print("DEBUG: Setting page content for measurement...")
+            logger.debug("Setting page content for measurement...")
             await page.set_content(initial_html, wait_until="networkidle")
             # Ensure web fonts are fully loaded before measuring heights
             await page.evaluate("() => document.fonts.ready")
@@ -362,7 +417,7 @@ async def generate_recipe_pdf(video_id: str) -> bytes:
             split_data = await measure_content_and_split(page, recipe)
             
             # Second pass: Re-render with split data
-            print("DEBUG: Re-rendering HTML with split data...")
+            logger.debug("Re-rendering HTML with split data...")
             final_html = template.render(
                 recipe=recipe,
                 metadata=metadata,
@@ -377,7 +432,7 @@ async def generate_recipe_pdf(video_id: str) -> bytes:
             
             # Generate PDF with A4 size
             # Margins are handled via padding in the HTML template
-            print("DEBUG: Generating PDF...")
+            logger.debug("Generating PDF...")
             pdf_bytes = await page.pdf(
                 format="A4",
                 print_background=True,
@@ -390,11 +445,11 @@ async def generate_recipe_pdf(video_id: str) -> bytes:
             )
             
             await browser.close()
-            print(f"DEBUG: PDF generated successfully ({len(pdf_bytes)} bytes)")
+            logger.debug("PDF generated successfully (%s bytes)", len(pdf_bytes))
             return pdf_bytes
             
     except Exception as e:
-        print(f"DEBUG: PDF generation failed: {e}")
+        logger.debug("PDF generation failed: %s", e)
         raise Exception(f"Failed to generate PDF: {str(e)}")
 
 
@@ -406,12 +461,13 @@ def get_cached_pdf_path(video_id: str) -> Path:
 
 def load_cached_pdf(video_id: str) -> Optional[bytes]:
     """Load a cached PDF if it exists"""
-    pdf_path = get_cached_pdf_path(video_id)
-    if pdf_path.exists():
-        print(f"DEBUG: Loading cached PDF for video {video_id}")
-        with open(pdf_path, 'rb') as f:
-            return f.read()
-    return None
+    try:
+        with open(get_cached_pdf_path(video_id), 'rb') as f:
+            pdf_bytes = f.read()
+    except FileNotFoundError:
+        return None
+    logger.debug("Loading cached PDF for video %s", video_id)
+    return pdf_bytes
 
 
 def save_pdf_to_cache(video_id: str, pdf_bytes: bytes) -> None:
@@ -419,7 +475,7 @@ def save_pdf_to_cache(video_id: str, pdf_bytes: bytes) -> None:
     pdf_path = get_cached_pdf_path(video_id)
     with open(pdf_path, 'wb') as f:
         f.write(pdf_bytes)
-    print(f"DEBUG: Saved PDF to cache for video {video_id}")
+    logger.debug("Saved PDF to cache for video %s", video_id)
 
 
 async def generate_or_load_pdf(video_id: str, force_regenerate: bool = False) -> bytes:
@@ -149,3 +149,20 @@ INPUT JSON:
 
 {input_data}
 """
+
+# Static part of the prompt (everything before the input JSON), with the
+# .format() brace escaping undone. Callers append the serialized input so the
+# prefix stays byte-identical across requests for Gemini prompt caching.
+RECIPE_EXTRACTION_PROMPT_PREFIX = (
+    RECIPE_EXTRACTION_PROMPT.split("{input_data}")[0].replace("{{", "{").replace("}}", "}")
+)
+
+# Appended after the input JSON when the video itself is attached instead of a
+# transcript (see extract_recipe_gemini_from_video)
+RECIPE_FROM_VIDEO_NOTE = """
+
+
+NOTE: The input above has no transcript. The video itself is attached instead;
+use its narration, on-screen text and visuals in place of the transcript, in the
+order they appear in the video.
+"""
@@ -1,169 +1,128 @@
-TIMESTAMP_EXTRACTION_PROMPT = """
-# YouTube Cooking Video Timestamp Analysis Assistant
-
-## Role
-You are a specialized video analysis assistant designed to identify precise timestamps for specific cooking steps in YouTube long-form recipe videos, as well as the best visual representation of the completed dish.
-
-## Primary Objective
-Analyze the provided YouTube cooking video and identify:
-1. The exact start time (timestamp) for each cooking step listed in the JSON object below
-2. The timestamp showing the **best visual representation of the completed dish**
-3. A detailed description of the final dish appearance and presentation
-
-Prioritize the best demonstration of each step that provides maximum clarity and instructional value for home cooks.
-
-## Analysis Instructions
-
-### Timestamp Selection Criteria:
-
-**For Cooking Steps:**
-1. **Best Demonstration Priority**: When a cooking step occurs multiple times, choose the clearest, most instructive occurrence
-2. **Visual Clarity**: Select moments with optimal camera angles and lighting that show the technique clearly
-3. **Peak Action Focus**: Identify the **middle or peak of the action**, NOT when it's first mentioned or when preparation begins
-   - For "crack eggs": timestamp when the egg is being cracked, not when they pick up the egg
-   - For "whisk": timestamp when they're actively whisking, not when they pick up the whisk
-   - For "flip": timestamp during the flip motion, not before
-4. **Timing Buffer**: Add 3-5 seconds to the moment when the action is first mentioned to capture the actual execution
-5. **Instructional Value**: Choose timestamps that best serve someone learning the cooking technique
-
-**For Completed Dish Representation:**
-1. **End of Video Priority**: ALWAYS select the timestamp from the final segment of the video, typically during the plating and presentation phase
-2. **Stable Shot Required**: Choose a moment when the dish is FULLY visible and stable on screen - NOT during transitions, fade-ins, fade-outs, or camera movements
-3. **Wait for Full Reveal**: If the dish appears during a transition or fade-in, wait 2-3 seconds after the transition completes to ensure the shot is stable and fully revealed
-4. **Visual Appeal**: Choose the moment with the most attractive, well-lit presentation of the finished dish
-5. **Completeness**: Ensure all components of the dish are visible and properly arranged
-6. **Plating Focus**: Prioritize shots where the dish is fully plated and styled for final presentation
-7. **Clarity**: Select a stable, clear shot rather than quick glimpses or transitions
-8. **Clean Framing**: Avoid timestamps with text overlays, logos, faces, or transitions
-9. **Timing**: Look specifically in the last 1-3 minutes of the video where the finished dish is typically showcased
-
-**For Completed Dish Description:**
-Provide an extremely detailed visual description as if instructing a master painter or AI image generation model to recreate the exact dish presentation verbatim. Be as specific, comprehensive, and precise as possible - include every visible detail, exact colors, textures, lighting, proportions, and spatial relationships.
-
-**Required Detail Categories:**
-
-1. **Serving Vessel & Background**:
-   - Exact type of plate, bowl, board, or container (material, color, size, shape)
-   - Surface texture and finish of the serving vessel
-   - Any background elements, table setting, or surface the dish is placed on
-   - Lighting and shadows cast by the vessel
-
-2. **Dish Structure & Layout**:
-   - Overall shape and volume of the food
-   - How different components are arranged relative to each other
-   - Height, depth, and three-dimensional structure
-   - Portion size and distribution across the plate
-   - Symmetry or asymmetry of the plating
-
-3. **Color Palette & Light**:
-   - Dominant colors and their exact shades (hex codes if possible)
-   - Color gradients, transitions, and contrasts
-   - Lighting effects (natural light, studio lighting, shadows)
-   - Reflections, highlights, and surface textures visible through light
-   - Temperature colors (warm golds, cool blues, etc.)
-
-4. **Visible Ingredients & Components**:
-   - Every single visible ingredient, including sizes, shapes, and positions
-   - Textures (crispy, soft, glossy, matte, rough, smooth)
-   - Cooking states (crispy edges, tender centers, caramelized surfaces)
-   - Layering and how ingredients interact visually
-   - Any visible cooking techniques (grill marks, charring, glazing)
-
-5. **Garnishes & Finishing Touches**:
-   - All garnishes, drizzles, dustings, and decorative elements
-   - Exact placement and positioning of each garnish
-   - Types and colors of herbs, microgreens, edible flowers
-   - Sauces, reductions, oils - their viscosity, flow patterns, pooling
-   - Spices, salts, or powders and their distribution patterns
-
-6. **Presentation Style & Technique**:
-   - Plating method (centered, offset, scattered, stacked)
-   - Professional plating techniques used (quenelle, smear, dot, zigzag)
-   - Balance and composition principles
-   - Focal points and visual hierarchy
-   - Empty space usage and negative space
-
-7. **Contextual Elements**:
-   - Side dishes, accompaniments, or complementary items
-   - Utensils, tools, or serving accessories visible
-   - Table linen, napkins, or additional tableware
-   - Overall dining context or setting implied
-
-8. **Atmosphere & Mood**:
-   - Warmth/coolness conveyed through colors and lighting
-   - Freshness indicators and quality markers
-   - Appetizing qualities and visual appeal factors
-   - Cultural or cuisine-specific presentation cues
-
-**Description Style:**
-- Write as a single, flowing paragraph that could be given directly to a master painter or advanced AI image generator for verbatim recreation
-- Use hyper-precise, sensory language that captures every visual nuance for exact reproduction
-- Include specific measurements, proportions, and spatial relationships wherever observable
-- Describe lighting, shadows, reflections, textures, and surface qualities in meticulous detail
-- Use exact color specifications (hex codes, precise color names, gradients) when possible
-- Describe three-dimensional form, depth, and volumetric qualities
-- Note every visible ingredient, garnish, and finishing element with exact positioning
-- Use professional culinary, artistic, and photographic terminology to convey precise visual information
-
-### Precision Standards:
-- Identify the **peak moment** of the cooking action, not the beginning
-- Add 3-5 seconds buffer from when the step is first mentioned to when it's actually performed
-- Focus on actual execution rather than preparation or discussion phases
-- When giving a time range, choose it so the **middle of the range** (where we capture a frame) shows the clearest, most stable view of the action or dish
-- Avoid ranges where the midpoint lands on a transition, motion blur, or a hand blocking the food; shift the range so the midpoint is clean and well-lit
-- For dish visuals, add 2-3 seconds after any transition to ensure a stable, fully-revealed shot and make sure the midpoint is the prettiest plated view
-
-### Quality Assurance:
-- Only provide timestamps when you can confidently identify the step
-- Return `null` for any step you cannot locate with certainty
-- Ensure selected moments provide clear visual understanding of the technique
-- For the dish representation, ensure it matches the described dish and comes from the END of the video
-- **CRITICAL**: Verify the dish_visual timestamp shows a STABLE, FULLY-REVEALED shot with NO active transitions
-
-## Output Requirements
-
-**CRITICAL**: Your response must be exclusively a single, valid JSON object with no additional text, explanations, or commentary.
-
-### Format Specifications:
-- **Keys**:
-  - Use exact step numbers from the input JSON (maintain as strings)
-  - Use `"dish_visual"` as the key for the completed dish timestamp
-  - Use `"dish_description"` as the key for the detailed dish description
-- **Values**:
-  - Timestamps: Time range strings in "M:SS-M:SS" or "MM:SS-MM:SS" format using **short, 3-5 second ranges**
-    - Example: "1:23-1:27" means the action occurs somewhere between 1:23 and 1:27
-    - Provide a range that captures the peak action moment with a clean midpoint
-  - Description: Detailed string description of the final dish appearance
-- **Unknown Steps**: Use `null` for steps that cannot be confidently identified
-- **JSON Standards**: Proper quotation marks, commas, and bracket formatting
-- **Key Order**: Always place `"dish_visual"` and `"dish_description"` as the LAST two keys in the JSON object
-
-### Example Output:
-```json
-{{
-  "2": "1:23-1:28",
-  "6": "4:17-4:22",
-  "7": "5:42-5:47",
-  "dish_visual": "12:45-12:50",
-  "dish_description": "A pristine white porcelain dinner plate measuring approximately 10 inches in diameter sits centered on a rustic oak wooden table surface with natural grain patterns visible. The plate features a slightly raised rim and glossy finish that catches warm overhead lighting. Two generous nests of freshly cooked spaghetti carbonara are artfully twirled and positioned slightly off-center to the left, creating an asymmetrical but balanced composition. Each pasta portion measures about 4 inches in diameter and 1.5 inches high, with individual strands of spaghetti coated in a rich, creamy carbonara sauce that has a glossy, almost translucent sheen in the lighting. The sauce appears as a warm golden-brown (#D4AF37) with subtle variations from medium to dark amber where it pools between the pasta strands. Scattered throughout are irregular pieces of crispy pancetta and guanciale, ranging from 1/4 to 1/2 inch cubes, with deep mahogany-brown exteriors (#8B4513) and paler interiors visible where pieces are broken. A generous dusting of freshly grated Pecorino Romano cheese creates a fine, snow-like powder across the surface in varying densities from heavy concentrations to light veils, appearing as pure white (#FFFFFF) with slight yellowish undertones. Delicate rings of thinly sliced green onions form graceful arcs across the top, their vibrant spring green (#228B22) providing the only cool color contrast against the warm palette. Whole black peppercorns are scattered strategically, appearing as small, glossy black spheres approximately 1/8 inch in diameter. Additional crispy pancetta shards are artfully placed as garnish elements around the perimeter, some standing upright like small sculptures. A thin drizzle of extra virgin olive oil creates subtle reflective pools and winding trails across the pasta surface, adding liquid highlights that catch the light. The overall composition features a warm color palette dominated by golds (#DAA520), ambers (#FFBF00), and whites (#FFFFF0) with strategic green accents, photographed from directly overhead with soft shadows cast by the elevated pasta portions, served steaming hot with rustic crusty bread slices arranged on the right side of the plate."
-}}
-```
-
-## Constraints
-- Provide only the final JSON timestamp mapping
-- No explanatory text, reasoning, or additional commentary
-- No markdown formatting or code blocks in the response
-- Focus exclusively on YouTube video format optimization
-- Maintain exact key formatting from input JSON
-- Always include the `"dish_visual"` and `"dish_description"` keys as the LAST two items in the output
-- The `"dish_visual"` timestamp MUST come from the end/conclusion of the video
-- The `"dish_visual"` timestamp MUST show a stable, fully-revealed shot with NO transitions
-- The `"dish_description"` must be extremely detailed and comprehensive, suitable for verbatim recreation by a painter or AI image model, covering all visual aspects including colors, textures, lighting, composition, and specific ingredient placement
-
----
-
-## INPUT
-
-### Steps to Locate:
-{key_steps_json}
-"""
+import functools
+import hashlib
+import os
+import re
+from pathlib import Path
+
+# The prompt text lives in timestamp_extraction.txt, split into sections by
+# "<<<name>>>" marker lines. Timestamps and the dish description are requested
+# in two independent calls that share the same header:
+#   header                  - shared role block (common cacheable prefix)
+#   timestamp_instructions  - step / dish_visual timestamp rules
+#   timestamp_example       - few-shot timestamp example
+#   timestamp_constraints   - timestamp output constraints
+#   dish_instructions       - dish description checklist
+#   dish_example            - few-shot description example (~400 tokens)
+#   dish_constraints        - description output constraints
+#   input                   - per-request tail containing the <<KEY_STEPS_JSON>> sentinel
+#   dish_input              - fixed user text for the description call
+PROMPT_PATH = Path(__file__).parent / "timestamp_extraction.txt"
+_SECTION_MARKER = re.compile(r"^<<<(\w+)>>>\n", re.MULTILINE)
+
+
+_BLANK_LINE_RUNS = re.compile(r"\n{3,}")
+_INNER_SPACE_RUNS = re.compile(r"(?<=\S) {2,}")
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse blank-line runs and mid-line space runs (they only cost tokens)"""
+    text = _BLANK_LINE_RUNS.sub("\n\n", text)
+    # Leading indentation is kept: it encodes Markdown list nesting
+    return _INNER_SPACE_RUNS.sub(" ", text)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_sections() -> dict:
+    """Read, normalize and split the prompt resource once per process"""
+    text = _normalize_whitespace(PROMPT_PATH.read_text(encoding="utf-8"))
+    parts = _SECTION_MARKER.split(text)
+    sections = dict(zip(parts[1::2], parts[2::2]))
+    sections["header"] = sections["header"].lstrip()
+    return sections
+
+
+# Loaded at import so prefork servers read the file once in the parent process
+_SECTIONS = _load_sections()
+
+# Static instructions. Kept byte-identical across requests (no interpolation) so the
+# provider can reuse its prompt-prefix cache; send as the system instruction.
+SYSTEM_PROMPT_HEAD = _SECTIONS["header"]
+
+# Set TIMESTAMP_PROMPT_INCLUDE_EXAMPLE=false to drop the example blocks
+INCLUDE_EXAMPLE = os.getenv("TIMESTAMP_PROMPT_INCLUDE_EXAMPLE", "true").lower() != "false"
+
+# Each prompt is sent as two system-instruction segments: the rules first and the
+# few-shot example second, so tweaking (or dropping) the example leaves the
+# longer rules segment as an unchanged cacheable prefix.
+TIMESTAMP_RULES = (
+    SYSTEM_PROMPT_HEAD + _SECTIONS["timestamp_instructions"] + _SECTIONS["timestamp_constraints"]
+)
+TIMESTAMP_EXAMPLE = _SECTIONS["timestamp_example"]
+
+DISH_DESCRIPTION_RULES = (
+    SYSTEM_PROMPT_HEAD + _SECTIONS["dish_instructions"] + _SECTIONS["dish_constraints"]
+)
+DISH_DESCRIPTION_EXAMPLE = _SECTIONS["dish_example"]
+
+# User text for the dish description call (it needs no step list)
+DISH_DESCRIPTION_REQUEST = _SECTIONS["dish_input"]
+
+
+def get_system_segments(include_example: bool = INCLUDE_EXAMPLE) -> tuple:
+    """Return the static timestamp prompt segments (rules, then optional example)"""
+    return (TIMESTAMP_RULES, TIMESTAMP_EXAMPLE) if include_example else (TIMESTAMP_RULES,)
+
+
+def get_dish_description_segments(include_example: bool = INCLUDE_EXAMPLE) -> tuple:
+    """Return the static dish description prompt segments (rules, then optional example)"""
+    return (DISH_DESCRIPTION_RULES, DISH_DESCRIPTION_EXAMPLE) if include_example else (DISH_DESCRIPTION_RULES,)
+
+
+def get_system_instruction(include_example: bool = INCLUDE_EXAMPLE) -> str:
+    """Return the static timestamp prompt as a single string"""
+    return "".join(get_system_segments(include_example))
+
+
+# Per-request tail; the only variable part of the prompt. Uses a sentinel rather
+# than str.format placeholders so no brace escaping is needed.
+KEY_STEPS_SENTINEL = "<<KEY_STEPS_JSON>>"
+TIMESTAMP_EXTRACTION_PROMPT_SUFFIX_TEMPLATE = _SECTIONS["input"]
+
+# Pre-split once at import; build_prompt() is then a plain concatenation
+_HEAD, _TAIL = TIMESTAMP_EXTRACTION_PROMPT_SUFFIX_TEMPLATE.split(KEY_STEPS_SENTINEL)
+
+
+def build_prompt(key_steps_json: str) -> str:
+    """
+    Build the per-request prompt text for the given key steps JSON string.
+    Pass canonical JSON (sorted keys, compact separators) so identical step
+    lists always produce byte-identical prompts.
+    """
+    return _HEAD + key_steps_json + _TAIL
+
+
+# Snapshot of the first ~256 tokens (1024 characters) of the timestamp rules.
+# Edits to that leading block change the prefix Gemini routes its cache on;
+# prefix_snapshot_matches() lets startup checks flag it. Update the snapshot
+# deliberately when the head of the prompt is meant to change.
+PREFIX_SNAPSHOT_CHARS = 1024
+PREFIX_SNAPSHOT_SHA1 = "981389213004"
+
+
+def prefix_snapshot_matches() -> bool:
+    """True if the leading block of the timestamp rules is unchanged"""
+    head = TIMESTAMP_RULES[:PREFIX_SNAPSHOT_CHARS].encode("utf-8")
+    return hashlib.sha1(head).hexdigest()[:12] == PREFIX_SNAPSHOT_SHA1
+
+
+# Short hash of every prompt text actually sent (honouring INCLUDE_EXAMPLE).
+# Response caches include it in their keys so any prompt edit invalidates
+# stale entries without a manual flush.
+TIMESTAMP_EXTRACTION_PROMPT_VERSION = hashlib.sha1(
+    (
+        get_system_instruction()
+        + "".join(get_dish_description_segments())
+        + DISH_DESCRIPTION_REQUEST
+        + TIMESTAMP_EXTRACTION_PROMPT_SUFFIX_TEMPLATE
+    ).encode("utf-8")
+).hexdigest()[:12]
@@ -0,0 +1,85 @@
+"""
+Semantic Response Cache
+Reuses LLM responses for near-duplicate inputs (e.g. re-uploads or mirrors of the
+same recipe video) by nearest-neighbour search over text embeddings.
+Entries are stored per namespace as a JSON file next to the per-video cache.
+"""
+
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cache_manager
+
+logger = logging.getLogger(__name__)
+
+# Disabled by default: a hit reuses another video's response
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+
+# Kept outside CACHE_DIR so list_cached_videos() does not pick it up as a video
+SEMANTIC_CACHE_DIR = cache_manager.BASE_DIR / "semantic_cache"
+
+# In-memory copy of each namespace index: {namespace: [entry, ...]}
+_indexes: Dict[str, List[Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length so cosine similarity is a plain dot product"""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+def _index_path(namespace: str):
+    return SEMANTIC_CACHE_DIR / f"{namespace}.json"
+
+
+def _load_index(namespace: str) -> List[Dict[str, Any]]:
+    """Load a namespace index from disk on first use (caller holds the lock)"""
+    if namespace not in _indexes:
+        try:
+            _indexes[namespace] = cache_manager.read_json(_index_path(namespace))
+        except FileNotFoundError:
+            _indexes[namespace] = []
+    return _indexes[namespace]
+
+
+def lookup(namespace: str, embedding: List[float], exclude_key: Optional[str] = None) -> Optional[Tuple[float, str, Any]]:
+    """
+    Find the most similar cached entry.
+
+    Args:
+        namespace: Cache namespace (e.g. "timestamps")
+        embedding: Query embedding
+        exclude_key: Entry key to ignore (usually the current video_id)
+
+    Returns:
+        (similarity, key, response) for the nearest entry, or None if the index is empty
+    """
+    query = _normalize(embedding)
+    best = None
+    with _lock:
+        entries = _load_index(namespace)
+        for entry in entries:
+            if entry["key"] == exclude_key:
+                continue
+            similarity = sum(a * b for a, b in zip(query, entry["embedding"]))
+            if best is None or similarity > best[0]:
+                best = (similarity, entry["key"], entry["response"])
+    return best
+
+
+def store(namespace: str, embedding: List[float], key: str, response: Any) -> None:
+    """Add or replace the entry for key and persist the namespace index"""
+    entry = {"key": key, "embedding": _normalize(embedding), "response": response}
+    with _lock:
+        entries = [e for e in _load_index(namespace) if e["key"] != key]
+        entries.append(entry)
+        _indexes[namespace] = entries
+        SEMANTIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_manager.write_json(_index_path(namespace), entries, indent=False)
+    logger.debug("Stored %s semantic cache entry for %s", namespace, key)
@@ -1,54 +1,283 @@
 import os
+import asyncio
+import atexit
 import json
+import logging
+import queue
+import hashlib
+import functools
 import re
 import subprocess
-import tempfile
+import sys
+import threading
+import time
 import base64
-from typing import Dict, List, Optional
-import yt_dlp
+import io
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from typing import Callable, Dict, List, Optional, Tuple
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same results but slower
+    orjson = None
+try:
+    import ijson
+except ImportError:  # captions are then parsed from the full body
+    ijson = None
+try:
+    import av
+except ImportError:  # frames are then extracted by ffmpeg subprocesses
+    av = None
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from google import genai
 from google.genai import types
 from groq import Groq
 import cache_manager
+import semantic_cache
 from prompts import recipe_extraction, timestamp_extraction, recipe_validation
 
+# Unconfigured here: the application decides whether debug output is shown
+logger = logging.getLogger(__name__)
+
 # Initialize Gemini client
 api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
 if not api_key:
     raise ValueError("API key not found. Please set GEMINI_API_KEY or GOOGLE_API_KEY environment variable.")
-print(f"DEBUG: Using API key: {api_key[:20]}...{api_key[-4:]}")
+logger.debug("Using API key: %s...%s", api_key[:20], api_key[-4:])
 client = genai.Client(api_key=api_key)
 
+# Shared HTTP session for subtitle downloads: keep-alive connection pooling
+# avoids a TCP+TLS handshake per request, with retries on transient errors
+_SESSION = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+)
+_SESSION.mount("https://", _HTTP_ADAPTER)
+_SESSION.mount("http://", _HTTP_ADAPTER)
+atexit.register(_SESSION.close)
+HTTP_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+# Secondary cache writes (content-hash and keyed entries, semantic index,
+# validation) are not read back within the same request, so they are written
+# off the request path. Primary step files (metadata, transcript, recipe,
+# timestamps, frames) stay synchronous: main.py checks for them right after.
+_cache_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-write")
+atexit.register(_cache_executor.shutdown)
+
+
+def _persist_in_background(save_fn: Callable, *args) -> None:
+    """Run a cache write on the background writer, logging (not raising) failures"""
+    def run():
+        try:
+            save_fn(*args)
+        except Exception as e:
+            logger.warning("Background cache write %s failed: %s", save_fn.__name__, e)
+    _cache_executor.submit(run)
+
+
+_VIDEO_ID_RE = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/)([A-Za-z0-9_-]{11})')
+
+
+@functools.lru_cache(maxsize=256)
+def get_video_id(url: str) -> str:
+    """Extract the 11-character video ID from a watch, youtu.be, shorts or embed URL"""
+    match = _VIDEO_ID_RE.search(url)
+    if not match:
+        raise ValueError(f"No YouTube video ID in URL: {url}")
+    return match.group(1)
+
+
+# yt-dlp option sets, each with a pool of long-lived YoutubeDL instances (see _extract_info)
+_YDL_METADATA_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': False,
+}
+_YDL_SUBTITLE_OPTS = {
+    'skip_download': True,
+    'writesubtitles': True,
+    'writeautomaticsub': True,
+    'subtitleslangs': ['en'],
+    'quiet': True,
+    # Use multiple player clients to improve subtitle availability and
+    # reduce reliance on a local JS runtime.
+    'extractor_args': {'youtube': {'player_client': ['default', 'web', 'android']}},
+}
+_YDL_STREAM_OPTS = {
+    # Frames are read straight from this URL by ffmpeg (input-side -ss does HTTP
+    # range seeks, nothing is downloaded). Capping at 720p keeps the fetched
+    # segments and decode cost small on HD/4K uploads; still enough for the PDF.
+    # Video-only streams come first: YouTube's progressive MP4 is now 360p.
+    "format": 'bestvideo[ext=mp4][height<=720]/best[ext=mp4][height<=720]/bestvideo[ext=mp4]/best[ext=mp4]/best',
+    "quiet": True,
+    "no_warnings": True,
+    # Add options to bypass YouTube restrictions
+    "http_headers": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-us,en;q=0.5",
+        "Sec-Fetch-Mode": "navigate",
+    },
+    "source_address": "0.0.0.0",
+    "retries": 10,
+    "fragment_retries": 10,
+    "extractor_args": {"youtube": {"player_client": ["android", "web"]}},
+}
+
+# Idle YoutubeDL instances per option set: {id(opts): SimpleQueue}
+_ydl_pools: Dict[int, queue.SimpleQueue] = {}
+
+
+def _extract_info(opts: dict, url: str) -> dict:
+    """
+    Run extract_info on an idle YoutubeDL for the option set, creating one only
+    when all are busy. Construction loads extractors and cookie jars, so it is
+    done once per concurrent caller instead of per call, and any worker thread
+    can reuse a warm instance. YoutubeDL is not documented as thread-safe, so an
+    instance is only ever used by one call at a time.
+    """
+    pool = _ydl_pools.setdefault(id(opts), queue.SimpleQueue())
+    try:
+        ydl = pool.get_nowait()
+    except queue.Empty:
+        # Imported on first use: a process serving cached videos never loads
+        # yt-dlp's extractor modules
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(opts)
+    try:
+        return ydl.extract_info(url, download=False)
+    finally:
+        pool.put(ydl)
+
+
+def _loads(data):
+    """Parse JSON from str or bytes, with orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj) -> str:
+    """Serialize to a compact JSON string, with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
 
-def get_video_metadata(url: str) -> dict:
-    """Fetch video metadata using yt-dlp"""
+def _dumps_canonical(obj) -> str:
+    """Compact JSON with sorted keys, byte-stable for prompts and cache keys"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _metadata_from_info(info: dict) -> dict:
+    """The metadata fields we keep from a yt-dlp info dict"""
+    return {
+        "title": info.get("title"),
+        "description": info.get("description"),
+        "duration": info.get("duration"),
+        "channel_name": info.get("uploader", info.get("channel")),
+        "channel_url": info.get("uploader_url", info.get("channel_url")),
+    }
+
+
+# Fields YouTube's oEmbed endpoint provides without running yt-dlp
+_OEMBED_FIELDS = frozenset({"title", "channel_name", "channel_url"})
+
+
+def _oembed_metadata(url: str) -> dict:
+    """Title and channel from YouTube oEmbed: one small JSON request instead of a yt-dlp extraction"""
+    response = _SESSION.get(
+        "https://www.youtube.com/oembed", params={"url": url, "format": "json"}, timeout=(3, 3)
+    )
+    response.raise_for_status()
+    data = _loads(response.content)
+    return {
+        "title": data.get("title"),
+        "channel_name": data.get("author_name"),
+        "channel_url": data.get("author_url"),
+    }
+
+
+def get_video_metadata(url: str, fields: Optional[frozenset] = None) -> dict:
+    """
+    Fetch video metadata using yt-dlp.
+    Callers that only need some of title/channel_name/channel_url can pass them
+    as fields; on a cache miss those come from oEmbed instead (partial result,
+    not cached), with yt-dlp as the fallback.
+    """
     # Extract video ID
-    video_id = url.split("v=")[-1].split("&")[0]
+    video_id = get_video_id(url)
     
     # Check cache first
     cached_metadata = cache_manager.load_step(video_id, "metadata")
     if cached_metadata:
         return cached_metadata
     
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': False,
-    }
+    if fields is not None and fields <= _OEMBED_FIELDS:
+        try:
+            return _oembed_metadata(url)
+        except Exception as e:
+            logger.debug("oEmbed metadata failed, using yt-dlp: %s", e)
     
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-        metadata = {
-            "title": info.get("title"),
-            "description": info.get("description"),
-            "duration": info.get("duration"),
-            "channel_name": info.get("uploader", info.get("channel")),
-            "channel_url": info.get("uploader_url", info.get("channel_url")),
-        }
-        
-        # Save to cache
-        cache_manager.save_step(video_id, "metadata", metadata)
-        return metadata
+    info = _extract_info(_YDL_METADATA_OPTS, url)
+    metadata = _metadata_from_info(info)
+    
+    # Save to cache
+    cache_manager.save_step(video_id, "metadata", metadata)
+    return metadata
+
+
+# Regexes compiled once at import instead of on every call
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+# Single-line only, so a stray '<' in cue text cannot swallow the next '-->' timing line.
+# VTT patterns are bytes so the body is scanned without decoding it first.
+_VTT_TAG_RE = re.compile(rb'<[^>\n]+>')
+_STREAM_EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d+)')
+# A timestamp range such as "1:23-1:28"; start and end in one match
+_TIMESTAMP_RANGE_RE = re.compile(r'^\s*([\d:.]+)\s*-\s*([\d:.]+)\s*$')
+# Cue text: the non-blank lines after a timing line, stopping at the first
+# blank line or the next timing line. Header, NOTE/STYLE blocks and cue
+# identifiers have no timing line; the group is None for an empty cue.
+_VTT_TEXT_LINE = rb'(?![^\n]*-->)[^\n]*\S[^\n]*'
+_VTT_CUE_RE = re.compile(
+    rb'^(?:\d+:)?\d{2}:\d{2}\.\d{3}[ \t]+-->[^\n]*'
+    rb'(?:\n(' + _VTT_TEXT_LINE + rb'(?:\n' + _VTT_TEXT_LINE + rb')*))?',
+    re.MULTILINE,
+)
+
+
+def _clean_json(text: str) -> str:
+    """Remove trailing commas before closing braces or brackets"""
+    return _TRAILING_COMMA_RE.sub(r'\1', text)
+
+
+def _extract_json_block(text: str) -> str:
+    """
+    Return the body of the first ``` fenced block that holds a JSON object,
+    or the whole text if there is none. Linear str.find scan, no regex.
+    """
+    start = text.find("```")
+    while start != -1:
+        body_start = text.find("\n", start)
+        end = text.find("```", start + 3)
+        if end == -1:
+            break
+        # Skip the optional language tag (```json) on the opening fence line
+        if body_start == -1 or body_start > end:
+            body_start = start + 3
+        block = text[body_start:end].strip()
+        if block.startswith("{"):
+            logger.debug("Found JSON block in response")
+            return block
+        start = text.find("```", end + 3)
+    logger.debug("No JSON block found, trying to parse full text")
+    return text
 
 
 def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
@@ -64,7 +293,7 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
         Dict with 'is_recipe' (bool), 'confidence' (float), 'reason' (str)
     """
     # Extract video ID for caching
-    video_id = video_url.split("v=")[-1].split("&")[0]
+    video_id = get_video_id(video_url)
     
     # Check cache first
     cached_validation = cache_manager.load_step(video_id, "validation")
@@ -78,19 +307,13 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
     }
     
     prompt = recipe_validation.RECIPE_VALIDATION_PROMPT.format(
-        metadata=json.dumps(validation_input)
+        metadata=_dumps(validation_input)
     )
     
-    def clean_json(text: str) -> str:
-        """Remove trailing commas from JSON string"""
-        text = re.sub(r',\s*}', '}', text)
-        text = re.sub(r',\s*]', ']', text)
-        return text
-    
     try:
-        print(f"DEBUG: Validating video {video_id} with Groq...")
-        print(f"DEBUG: Video title: {metadata.get('title', 'N/A')}")
-        print(f"DEBUG: Video description length: {len(metadata.get('description', ''))} chars")
+        logger.debug("Validating video %s with Groq...", video_id)
+        logger.debug("Video title: %s", metadata.get('title', 'N/A'))
+        logger.debug("Video description length: %s chars", len(metadata.get('description', '')))
         
         # Initialize Groq client
         groq_api_key = os.getenv("GROK_API_KEY")
@@ -123,32 +346,24 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
                 if chunk.choices[0].delta.content:
                     response_text += chunk.choices[0].delta.content
             
-            print(f"DEBUG: Successfully received response from Groq")
+            logger.debug("Successfully received response from Groq")
         except Exception as e:
             error_msg = f"Validation model failed: {e}"
-            print(f"ERROR: {error_msg}")
+            logger.error(error_msg)
             raise Exception(error_msg)
         
-        print("DEBUG: Received validation response from Groq")
-        
-        # Extract JSON from response
-        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-        matches = re.findall(json_pattern, response_text, re.DOTALL)
-        
-        json_text = None
-        if matches:
-            print("DEBUG: Found JSON block in validation response")
-            json_text = matches[0]
-        else:
-            print("DEBUG: No JSON block found, trying to parse full text")
-            json_text = response_text
-        
-        # Clean and parse JSON
-        json_text = clean_json(json_text)
-        print(f"DEBUG: Parsing validation JSON (first 200 chars): {json_text[:200]}")
+        logger.debug("Received validation response from Groq")
         
+        json_text = response_text
         try:
-            validation_result = json.loads(json_text)
+            try:
+                # Fast path: the model usually answers with bare JSON
+                validation_result = _loads(json_text)
+            except json.JSONDecodeError:
+                # Extract, clean and parse a fenced JSON block
+                json_text = _clean_json(_extract_json_block(response_text))
+                logger.debug("Parsing validation JSON (first 200 chars): %s", json_text[:200])
+                validation_result = _loads(json_text)
             
             # Ensure required fields exist
             if "is_recipe" not in validation_result:
@@ -159,12 +374,12 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
                 validation_result["reason"] = "Validation completed"
             
             # Cache the result
-            cache_manager.save_step(video_id, "validation", validation_result)
+            _persist_in_background(cache_manager.save_step, video_id, "validation", validation_result)
             return validation_result
         except json.JSONDecodeError as je:
-            print(f"DEBUG: JSON parse error at position {je.pos}: {je.msg}")
-            print(f"DEBUG: Context around error: {json_text[max(0, je.pos-50):je.pos+50]}")
-            print(f"DEBUG: Full response text: {response_text[:500]}")
+            logger.debug("JSON parse error at position %s: %s", je.pos, je.msg)
+            logger.debug("Context around error: %s", json_text[max(0, je.pos-50):je.pos+50])
+            logger.debug("Full response text: %s", response_text[:500])
             # If we can't parse the response, try to infer from the raw text
             response_lower = response_text.lower()
             if any(keyword in response_lower for keyword in ['not a recipe', 'not recipe', 'is_recipe": false', '"is_recipe":false']):
@@ -174,7 +389,7 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
                     "reason": "Validation parsing failed but response indicates non-recipe"
                 }
             # Default to allowing through if we can't parse (conservative approach)
-            print("WARNING: Could not parse validation response, allowing video through")
+            logger.warning("Could not parse validation response, allowing video through")
             return {
                 "is_recipe": True,
                 "confidence": 0.5,
@@ -182,13 +397,13 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
             }
             
     except Exception as e:
-        print(f"DEBUG: Groq validation failed: {e}")
+        logger.debug("Groq validation failed: %s", e)
         import traceback
-        print(f"DEBUG: Traceback: {traceback.format_exc()}")
+        logger.debug("Traceback: %s", traceback.format_exc())
         # On error, log warning but default to allowing through (fail open)
         # This prevents blocking valid recipes due to validation service issues
         # However, we should investigate why validation is failing
-        print("WARNING: Validation service error - allowing video through. This may allow non-recipe videos.")
+        logger.warning("Validation service error - allowing video through. This may allow non-recipe videos.")
         return {
             "is_recipe": True,
             "confidence": 0.3,  # Lower confidence when validation fails
@@ -196,255 +411,1220 @@ def validate_is_recipe_video(metadata: dict, video_url: str) -> dict:
         }
 
 
-def get_transcript(video_id: str) -> List[str]:
+def _parse_vtt(content: bytes) -> List[str]:
+    """
+    Caption text of a raw WebVTT body, one string per cue. Tags are stripped
+    and cues found with one regex pass each, instead of a Python loop over lines,
+    and only the cue text is decoded.
+    """
+    if b'\r' in content:
+        content = content.replace(b'\r\n', b'\n')
+    return [
+        text for match in _VTT_CUE_RE.finditer(_VTT_TAG_RE.sub(b'', content))
+        if match.group(1) and (text := " ".join(match.group(1).decode("utf-8", errors="replace").split()))
+    ]
+
+
+def _join_event_segs(event: dict) -> str:
+    """
+    Coalesce one JSON3 caption event's word-level segs into a single string.
+    Auto-captions split every word into its own seg (with the leading space
+    included), so one string per event keeps the transcript list short.
+    """
+    text = "".join(seg.get('utf8') or "" for seg in event.get('segs', ()))
+    return text if text.strip() else ""
+
+
+# Upper bound on a subtitle download (decoded bytes). Real caption files are
+# well under this; anything larger is aborted instead of stalling the pipeline.
+MAX_SUBTITLE_BYTES = 5_000_000
+
+
+class SubtitleTooLargeError(ValueError):
+    pass
+
+
+class _SizeLimitedReader:
+    """File-like view of a streamed body that raises once more than limit bytes were read"""
+
+    def __init__(self, raw, limit: int):
+        self._raw = raw
+        self._limit = limit
+        self._read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._raw.read(size)
+        self._read += len(chunk)
+        if self._read > self._limit:
+            raise SubtitleTooLargeError(f"Subtitle file exceeds {self._limit} bytes")
+        return chunk
+
+
+def _check_subtitle_length(response: requests.Response) -> None:
+    """Fail before reading the body when the server already reports an oversized file"""
+    content_length = response.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_SUBTITLE_BYTES:
+        raise SubtitleTooLargeError(f"Subtitle file is {content_length} bytes (limit {MAX_SUBTITLE_BYTES})")
+
+
+def _read_subtitle_body(response: requests.Response) -> bytes:
+    """Read a streamed subtitle response, aborting past MAX_SUBTITLE_BYTES"""
+    with response:
+        _check_subtitle_length(response)
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > MAX_SUBTITLE_BYTES:
+                raise SubtitleTooLargeError(f"Subtitle file exceeds {MAX_SUBTITLE_BYTES} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+def _fetch_subtitle_body(url: str) -> bytes:
+    return _read_subtitle_body(_SESSION.get(url, timeout=HTTP_TIMEOUT, stream=True))
+
+
+def _fetch_hls_subtitle_segments(playlist_urls: List[str], parse_json: Callable[[bytes], List[str]]) -> List[str]:
+    """
+    Fetch every media segment of an HLS subtitle playlist concurrently (in
+    playlist order) and concatenate their caption text. Segments may be JSON3
+    or WebVTT; the combined size is held to MAX_SUBTITLE_BYTES.
+    """
+    with ThreadPoolExecutor(max_workers=min(16, len(playlist_urls))) as executor:
+        bodies = list(executor.map(_fetch_subtitle_body, playlist_urls))
+    if sum(map(len, bodies)) > MAX_SUBTITLE_BYTES:
+        raise SubtitleTooLargeError(f"HLS subtitle segments exceed {MAX_SUBTITLE_BYTES} bytes")
+    text_segments = []
+    for segment_body in bodies:
+        try:
+            text_segments += parse_json(segment_body)
+        except Exception:
+            text_segments += _parse_vtt(segment_body)
+    return text_segments
+
+
+def _stream_json3_segments(response: requests.Response) -> List[str]:
+    """
+    Collect caption text from a streamed JSON3 response event by event, so a
+    multi-MB caption file is never held in memory as one parsed document.
+    """
+    _check_subtitle_length(response)
+    response.raw.decode_content = True
+    body = _SizeLimitedReader(response.raw, MAX_SUBTITLE_BYTES)
+    return [text for event in ijson.items(body, 'events.item') if (text := _join_event_segs(event))]
+
+
+# Short-lived record of dead ends (no usable subtitles, frames ffmpeg could not
+# produce) so retries within the TTL skip the network round-trips. In memory as
+# {(video_id, what): expires_at}, persisted per video as the "negative" step.
+NEGATIVE_CACHE_TTL_SECONDS = 300
+_negative_cache: Dict[tuple, float] = {}
+_negative_cache_loaded: set = set()
+
+
+def _recently_failed(video_id: str, what: str) -> bool:
+    if video_id not in _negative_cache_loaded:
+        # First check for this video in this process: pick up failures recorded before a restart
+        _negative_cache_loaded.add(video_id)
+        for persisted_what, expires_at in (cache_manager.load_step(video_id, "negative") or {}).items():
+            _negative_cache.setdefault((video_id, persisted_what), expires_at)
+    return _negative_cache.get((video_id, what), 0) > time.time()
+
+
+def _remember_failure(video_id: str, what: str) -> None:
+    now = time.time()
+    _negative_cache[(video_id, what)] = now + NEGATIVE_CACHE_TTL_SECONDS
+    entries = {
+        key[1]: expires_at for key, expires_at in list(_negative_cache.items())
+        if key[0] == video_id and expires_at > now
+    }
+    _persist_in_background(cache_manager.save_step, video_id, "negative", entries)
+
+
+def _save_transcript(video_id: str, text_segments: List[str]) -> None:
+    """Cache a transcript; an empty one is also remembered as a recent failure"""
+    cache_manager.save_step(video_id, "transcript", text_segments)
+    if not text_segments:
+        _remember_failure(video_id, "transcript")
+
+
+def get_transcript(video_id: str, info: Optional[dict] = None) -> List[str]:
     """
     Fetch video transcript using yt-dlp.
+    Pass info to reuse a yt-dlp info dict already extracted with subtitle options.
     
     Returns:
         List of transcript text segments. Returns empty list if no transcript is available.
         Recipe extraction can still proceed using title and description only.
     """
-    print(f"DEBUG: Attempting to fetch transcript for video {video_id}")
+    logger.debug("Attempting to fetch transcript for video %s", video_id)
     
     # Check cache first
     cached_transcript = cache_manager.load_step(video_id, "transcript")
     if cached_transcript:
         return cached_transcript
+    if _recently_failed(video_id, "transcript"):
+        logger.debug("Transcript for %s recently unavailable, not retrying yet", video_id)
+        return []
     
     # Use yt-dlp to extract transcript
-    print("DEBUG: Using yt-dlp to extract transcript...")
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    ydl_opts = {
-        'skip_download': True,
-        'writesubtitles': True,
-        'writeautomaticsub': True,
-        'subtitleslangs': ['en'],
-        'quiet': True,
-        # Use multiple player clients to improve subtitle availability and
-        # reduce reliance on a local JS runtime.
-        'extractor_args': {'youtube': {'player_client': ['default', 'web', 'android']}},
-    }
+    if info is None:
+        logger.debug("Using yt-dlp to extract transcript...")
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        logger.debug("extracting info with yt-dlp...")
+        info = _extract_info(_YDL_SUBTITLE_OPTS, url)
     
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        print("DEBUG: extracting info with yt-dlp...")
-        info = ydl.extract_info(url, download=False)
-        
-        sub_url = None
-        # Check for manual subtitles
-        if 'subtitles' in info and 'en' in info['subtitles']:
-            print("DEBUG: Found manual subtitles")
-            sub_url = info['subtitles']['en'][0]['url']
-        # Check for automatic captions
-        elif 'automatic_captions' in info and 'en' in info['automatic_captions']:
-            print("DEBUG: Found automatic captions")
-            sub_url = info['automatic_captions']['en'][0]['url']
-        else:
-            print("DEBUG: No subtitles found in yt-dlp info")
+    sub_url = None
+    # Check for manual subtitles
+    if 'subtitles' in info and 'en' in info['subtitles']:
+        logger.debug("Found manual subtitles")
+        sub_url = info['subtitles']['en'][0]['url']
+    # Check for automatic captions
+    elif 'automatic_captions' in info and 'en' in info['automatic_captions']:
+        logger.debug("Found automatic captions")
+        sub_url = info['automatic_captions']['en'][0]['url']
+    else:
+        logger.debug("No subtitles found in yt-dlp info")
+        # Return empty list instead of raising - we can still extract from title/description
+        logger.warning("No transcript available for this video. Will attempt extraction from title and description only.")
+        _save_transcript(video_id, [])
+        return []
+    
+    # Download and parse VTT/JSON3
+    logger.debug("Fetching subtitles from %s...", sub_url[:50])
+    response = _SESSION.get(sub_url, timeout=HTTP_TIMEOUT, stream=True)
+    if not response.ok:
+        # e.g. rate limited; not evidence that the video has no captions
+        response.close()
+        logger.warning("Subtitle download failed with HTTP %s. Will attempt extraction from title and description only.", response.status_code)
+        return []
+    if ijson is not None and 'json' in response.headers.get('content-type', ''):
+        with response:
+            try:
+                text_segments = _stream_json3_segments(response)
+            except Exception as e:
+                # The body is partly consumed, so there is nothing left to fall
+                # back to; not cached, as a dropped connection looks the same
+                logger.debug("Streaming subtitle JSON parse failed: %s", e)
+                logger.warning("Could not parse subtitle content. Will attempt extraction from title and description only.")
+                return []
+        logger.debug("Extracted %s segments", len(text_segments))
+        _save_transcript(video_id, text_segments)
+        return text_segments
+    try:
+        body = _read_subtitle_body(response)
+    except SubtitleTooLargeError as e:
+        # Definitive: the same track will be too large next time
+        logger.warning("%s. Will attempt extraction from title and description only.", e)
+        _save_transcript(video_id, [])
+        return []
+    except requests.RequestException as e:
+        logger.warning("Subtitle download failed (%s). Will attempt extraction from title and description only.", e)
+        return []
+
+    def parse_json_response(data: bytes):
+        data = _loads(data)
+        return [text for event in data.get('events', ()) if (text := _join_event_segs(event))]
+
+    try:
+        text_segments = parse_json_response(body)
+        logger.debug("Extracted %s segments", len(text_segments))
+        _save_transcript(video_id, text_segments)
+        return text_segments
+    except Exception as e:
+        logger.debug("Failed to parse subtitle JSON: %s", e)
+        # Handle HLS playlists that need a second fetch
+        if body.lstrip().startswith(b"#EXTM3U"):
+            playlist_urls = [
+                urljoin(sub_url, line.strip()) for line in body.decode("utf-8", errors="replace").splitlines()
+                if line.strip() and not line.startswith("#")
+            ]
+            if playlist_urls:
+                logger.debug("Detected HLS subtitle playlist, fetching %s media segments...", len(playlist_urls))
+                try:
+                    text_segments = _fetch_hls_subtitle_segments(playlist_urls, parse_json_response)
+                    if text_segments:
+                        logger.debug("Extracted %s segments from HLS subtitle", len(text_segments))
+                        _save_transcript(video_id, text_segments)
+                        return text_segments
+                except Exception as inner_e:
+                    logger.debug("HLS subtitle fetch/parse failed: %s", inner_e)
+
+        # Try to parse as VTT format if JSON fails
+        try:
+            logger.debug("Response content type: %s", response.headers.get('content-type', 'unknown'))
+            logger.debug("Response starts with: %s...", body[:200])
+
+            # Try to parse VTT format
+            if b'WEBVTT' in body:
+                logger.debug("Detected VTT format, attempting to parse...")
+                text_segments = _parse_vtt(body)
+                if text_segments:
+                    logger.debug("Extracted %s VTT segments", len(text_segments))
+                    _save_transcript(video_id, text_segments)
+                    return text_segments
+
+            logger.debug("Could not parse subtitle content")
+            # Return empty list instead of raising - we can still extract from title/description.
+            # Not cached: only a video without caption tracks is a definitive miss.
+            logger.warning("Could not parse subtitle content. Will attempt extraction from title and description only.")
+            return []
+        except Exception as vtt_e:
+            logger.debug("VTT parsing also failed: %s", vtt_e)
             # Return empty list instead of raising - we can still extract from title/description
-            print("WARNING: No transcript available for this video. Will attempt extraction from title and description only.")
-            cache_manager.save_step(video_id, "transcript", [])
+            logger.warning("Subtitle parsing failed for both JSON and VTT formats. Will attempt extraction from title and description only.")
             return []
-        
-        # Download and parse VTT/JSON3
-        print(f"DEBUG: Fetching subtitles from {sub_url[:50]}...")
-        import requests
-        response = requests.get(sub_url)
-        content = response.text
-
-        def parse_json_response(resp):
-            data = resp.json()
-            segments = []
-            if 'events' in data:
-                for event in data['events']:
-                    if 'segs' in event:
-                        for seg in event['segs']:
-                            if 'utf8' in seg and seg['utf8'].strip():
-                                segments.append(seg['utf8'])
-            return segments
 
+
+def _fetch_metadata(url: str) -> Tuple[dict, Optional[dict]]:
+    """
+    Video metadata, plus the yt-dlp info dict when it had to be extracted with
+    subtitle options (transcript not cached either), so get_transcript can
+    reuse it instead of extracting the same video page again.
+    """
+    video_id = get_video_id(url)
+    metadata = cache_manager.load_step(video_id, "metadata")
+    if metadata:
+        return metadata, None
+    if cache_manager.load_step(video_id, "transcript"):
+        return get_video_metadata(url), None
+    
+    logger.debug("Extracting metadata and subtitles with one yt-dlp call...")
+    info = _extract_info(_YDL_SUBTITLE_OPTS, url)
+    metadata = _metadata_from_info(info)
+    cache_manager.save_step(video_id, "metadata", metadata)
+    return metadata, info
+
+
+def fetch_video_inputs(url: str) -> Tuple[dict, List[str]]:
+    """
+    Fetch video metadata and transcript.
+    When neither is cached, one yt-dlp extraction (with subtitle options)
+    provides both, instead of two extractions of the same video page.
+    """
+    metadata, info = _fetch_metadata(url)
+    return metadata, get_transcript(get_video_id(url), info=info)
+
+
+def fetch_validated_inputs(url: str) -> Tuple[dict, List[str], dict]:
+    """
+    fetch_video_inputs plus validate_is_recipe_video. Validation only needs the
+    metadata, so its LLM call runs while the subtitles are downloaded and parsed.
+    
+    Returns:
+        (metadata, transcript, validation result)
+    """
+    metadata, info = _fetch_metadata(url)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        validation_future = executor.submit(validate_is_recipe_video, metadata, url)
+        transcript = get_transcript(get_video_id(url), info=info)
+        return metadata, transcript, validation_future.result()
+
+
+async def afetch_video_inputs(url: str) -> Tuple[dict, List[str]]:
+    """fetch_video_inputs off the event loop, for async endpoints"""
+    return await asyncio.to_thread(fetch_video_inputs, url)
+
+
+async def afetch_validated_inputs(url: str) -> Tuple[dict, List[str], dict]:
+    """fetch_validated_inputs off the event loop, for async endpoints"""
+    return await asyncio.to_thread(fetch_validated_inputs, url)
+
+
+# Structured output schema matching the OUTPUT JSON STRUCTURE in the recipe prompt.
+# is_key_step is optional: the prompt asks for it only on key steps.
+_STRING = types.Schema(type=types.Type.STRING)
+RECIPE_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={
+        "title": _STRING,
+        "description": _STRING,
+        "servings": _STRING,
+        "prep_time": _STRING,
+        "cook_time": _STRING,
+        "total_time": _STRING,
+        "difficulty": types.Schema(type=types.Type.STRING, enum=["Easy", "Intermediate", "Advanced"]),
+        "ingredients": types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={"quantity": _STRING, "unit": _STRING, "ingredient": _STRING, "purpose": _STRING},
+                required=["quantity", "unit", "ingredient", "purpose"],
+                property_ordering=["quantity", "unit", "ingredient", "purpose"],
+            ),
+        ),
+        "instructions": types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "step_number": types.Schema(type=types.Type.INTEGER),
+                    "category": types.Schema(type=types.Type.STRING, enum=["Prep", "Cook", "Plate/Finalize/Serve"]),
+                    "instruction": _STRING,
+                    "is_key_step": types.Schema(type=types.Type.BOOLEAN),
+                },
+                required=["step_number", "category", "instruction"],
+                property_ordering=["step_number", "category", "instruction", "is_key_step"],
+            ),
+        ),
+    },
+    required=[
+        "title", "description", "servings", "prep_time", "cook_time",
+        "total_time", "difficulty", "ingredients", "instructions",
+    ],
+    property_ordering=[
+        "title", "description", "servings", "prep_time", "cook_time",
+        "total_time", "difficulty", "ingredients", "instructions",
+    ],
+)
+
+
+def _generate_json_streamed(**kwargs) -> tuple:
+    """
+    Run generate_content_stream and, when ijson is installed, parse the JSON
+    incrementally as chunks arrive so parsing overlaps the rest of the response.
+
+    Returns:
+        (parsed, text) - parsed is None if incremental parsing was unavailable
+        or failed, in which case the caller parses text itself
+    """
+    chunks = []
+    parsed_items = ijson.sendable_list() if ijson is not None else None
+    parser = ijson.items_coro(parsed_items, '', use_float=True) if ijson is not None else None
+    for chunk in client.models.generate_content_stream(**kwargs):
+        text = chunk.text
+        if not text:
+            continue
+        chunks.append(text)
+        if parser is not None:
+            try:
+                parser.send(text.encode("utf-8"))
+            except Exception as e:
+                # Not bare JSON (e.g. fenced); keep collecting text for the fallback
+                logger.debug("Incremental JSON parse stopped: %s", e)
+                parser = None
+    if parser is not None:
         try:
-            text_segments = parse_json_response(response)
-            print(f"DEBUG: Extracted {len(text_segments)} segments")
-            cache_manager.save_step(video_id, "transcript", text_segments)
-            return text_segments
+            parser.close()
         except Exception as e:
-            print(f"DEBUG: Failed to parse subtitle JSON: {e}")
-            # Handle HLS playlists that need a second fetch
-            if content.lstrip().startswith("#EXTM3U"):
-                print("DEBUG: Detected HLS subtitle playlist, following first media URL...")
-                playlist_urls = [
-                    line.strip() for line in content.splitlines()
-                    if line.strip() and not line.startswith("#")
-                ]
-                if playlist_urls:
-                    sub_url = playlist_urls[0]
-                    print(f"DEBUG: Fetching subtitle segment {sub_url[:80]}...")
-                    response = requests.get(sub_url)
-                    content = response.text
-                    try:
-                        text_segments = parse_json_response(response)
-                        print(f"DEBUG: Extracted {len(text_segments)} segments from HLS subtitle")
-                        cache_manager.save_step(video_id, "transcript", text_segments)
-                        return text_segments
-                    except Exception as inner_e:
-                        print(f"DEBUG: HLS subtitle JSON parse failed: {inner_e}")
+            logger.debug("Incremental JSON parse stopped: %s", e)
+            parser = None
+    parsed = parsed_items[0] if parser is not None and parsed_items else None
+    return parsed, "".join(chunks)
 
-            # Try to parse as VTT format if JSON fails
-            try:
-                print(f"DEBUG: Response content type: {response.headers.get('content-type', 'unknown')}")
-                print(f"DEBUG: Response starts with: {content[:200]}...")
-
-                # Try to parse VTT format
-                if 'WEBVTT' in content:
-                    print("DEBUG: Detected VTT format, attempting to parse...")
-                    lines = content.split('\n')
-                    text_segments = []
-                    for line in lines:
-                        line = line.strip()
-                        # Skip VTT headers and timing lines
-                        if line and not line.startswith('WEBVTT') and not '-->' in line and not line.isdigit():
-                            # Remove HTML tags if any
-                            import re
-                            clean_line = re.sub(r'<[^>]+>', '', line)
-                            if clean_line.strip():
-                                text_segments.append(clean_line.strip())
-                    if text_segments:
-                        print(f"DEBUG: Extracted {len(text_segments)} VTT segments")
-                        cache_manager.save_step(video_id, "transcript", text_segments)
-                        return text_segments
 
-                print("DEBUG: Could not parse subtitle content")
-                # Return empty list instead of raising - we can still extract from title/description
-                print("WARNING: Could not parse subtitle content. Will attempt extraction from title and description only.")
-                cache_manager.save_step(video_id, "transcript", [])
-                return []
-            except Exception as vtt_e:
-                print(f"DEBUG: VTT parsing also failed: {vtt_e}")
-                # Return empty list instead of raising - we can still extract from title/description
-                print("WARNING: Subtitle parsing failed for both JSON and VTT formats. Will attempt extraction from title and description only.")
-                cache_manager.save_step(video_id, "transcript", [])
-                return []
+_RECIPE_MODEL = 'models/gemini-2.5-flash'
+
+
+# Gemini explicit context caching for the static recipe prompt prefix. Off by
+# default: cached content is billed for storage while it lives.
+GEMINI_RECIPE_CACHE_ENABLED = os.getenv("GEMINI_RECIPE_CACHE_ENABLED", "false").lower() == "true"
+GEMINI_RECIPE_CACHE_TTL_SECONDS = 3600
+
+# (cached_content_name, expires_at) for the recipe prompt prefix
+_recipe_prompt_cache: Optional[tuple] = None
+_recipe_prompt_cache_lock = threading.Lock()
+
+
+def _get_recipe_prompt_cache() -> Optional[str]:
+    """
+    Return the name of a Gemini cached-content object holding the static recipe
+    prompt prefix, creating or renewing it when needed. Returns None if caching
+    fails, in which case the caller sends the full prompt.
+    """
+    global _recipe_prompt_cache
+    # Leave a minute of headroom so the cache doesn't expire mid-request
+    entry = _recipe_prompt_cache
+    if entry and entry[1] > time.time() + 60:
+        return entry[0]
+    # Only callers that need a new cache wait here, for a single create call
+    with _recipe_prompt_cache_lock:
+        # Created by another request while this one waited
+        entry = _recipe_prompt_cache
+        if entry and entry[1] > time.time() + 60:
+            return entry[0]
+        try:
+            cached_content = client.caches.create(
+                model=_RECIPE_MODEL,
+                config=types.CreateCachedContentConfig(
+                    contents=[types.Content(
+                        role="user",
+                        parts=[types.Part(text=recipe_extraction.RECIPE_EXTRACTION_PROMPT_PREFIX)],
+                    )],
+                    ttl=f"{GEMINI_RECIPE_CACHE_TTL_SECONDS}s",
+                ),
+            )
+        except Exception as e:
+            logger.debug("Gemini recipe prompt cache creation failed, sending full prompt: %s", e)
+            return None
+        _recipe_prompt_cache = (cached_content.name, time.time() + GEMINI_RECIPE_CACHE_TTL_SECONDS)
+        logger.debug("Created Gemini recipe prompt cache %s", cached_content.name)
+        return cached_content.name
+
+
+# Cache namespaces include a hash of everything besides the input that shapes
+# the response (prompt, output schema, model), so editing any of them starts fresh
+_RECIPE_PROMPT_VERSION = hashlib.blake2b(
+    (
+        recipe_extraction.RECIPE_EXTRACTION_PROMPT_PREFIX
+        + RECIPE_SCHEMA.model_dump_json(exclude_none=True)
+        + _RECIPE_MODEL
+    ).encode("utf-8"),
+    digest_size=6,
+).hexdigest()
+_RECIPE_CACHE_NAMESPACE = f"recipe_{_RECIPE_PROMPT_VERSION}"
+
+
+def _recipe_content_key(input_data: dict) -> str:
+    """Hash of the canonical recipe input, identical for identical title/description/transcript"""
+    canonical = _dumps_canonical(input_data)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _semantic_recipe_lookup(video_id: str, input_data: dict) -> tuple:
+    """
+    Look up the recipe of a near-duplicate video (re-upload, mirror, trimmed cut)
+    by embedding the title and the opening transcript segments.
+
+    Returns:
+        (embedding, recipe) - embedding is None if embedding failed, and
+        recipe is None unless a match above SEMANTIC_MATCH_THRESHOLD was found
+    """
+    # Callers pass either flat title/description or a nested metadata dict
+    title = input_data.get("title") or (input_data.get("metadata") or {}).get("title") or ""
+    transcript = input_data.get("transcript") or []
+    if not transcript:
+        # Title alone is too weak a signal to reuse a whole recipe
+        return None, None
+    try:
+        embedding = _embed_text(" ".join([title] + transcript[:20]))
+    except Exception as e:
+        logger.debug("Semantic cache embedding failed: %s", e)
+        return None, None
+    
+    match = semantic_cache.lookup(_RECIPE_CACHE_NAMESPACE, embedding, exclude_key=video_id)
+    if not match or match[0] < SEMANTIC_MATCH_THRESHOLD:
+        return embedding, None
+    similarity, matched_video_id, recipe = match
+    logger.debug("Semantic recipe cache hit for %s from %s (similarity %.3f)", video_id, matched_video_id, similarity)
+    return embedding, recipe
+
+
+def _parse_recipe_text(json_text: str) -> dict:
+    """
+    Parse a recipe response. Structured output is plain JSON; the block scan
+    only matters if the model ever falls back to a fenced or chatty answer.
+    """
+    try:
+        return _loads(json_text)
+    except json.JSONDecodeError:
+        json_text = _clean_json(_extract_json_block(json_text))
+        logger.debug("Parsing JSON (first 200 chars): %s", json_text[:200])
+        try:
+            return _loads(json_text)
+        except json.JSONDecodeError as je:
+            logger.debug("JSON parse error at position %s: %s", je.pos, je.msg)
+            logger.debug("Context around error: %s", json_text[max(0, je.pos-50):je.pos+50])
+            raise
 
 
 def extract_recipe_gemini(input_data: dict, video_url: str, force_regenerate: bool = False) -> dict:
     """Extract structured recipe using Gemini"""
-    print("DEBUG: Starting Gemini recipe extraction...")
+    logger.debug("Starting Gemini recipe extraction...")
     
     # Extract video ID and check cache
-    video_id = video_url.split("v=")[-1].split("&")[0]
+    video_id = get_video_id(video_url)
     if not force_regenerate:
         cached_recipe = cache_manager.load_step(video_id, "recipe")
         if cached_recipe:
             return cached_recipe
     
-    prompt = recipe_extraction.RECIPE_EXTRACTION_PROMPT.format(input_data=json.dumps(input_data))
+    # Same input under another URL (e.g. a different watch link to the same upload)
+    content_key = _recipe_content_key(input_data)
+    if not force_regenerate:
+        content_recipe = cache_manager.load_blob(_RECIPE_CACHE_NAMESPACE, content_key)
+        if content_recipe is not None:
+            cache_manager.save_step(video_id, "recipe", content_recipe)
+            return content_recipe
+    
+    semantic_embedding = None
+    if semantic_cache.SEMANTIC_CACHE_ENABLED and not force_regenerate:
+        semantic_embedding, semantic_recipe = _semantic_recipe_lookup(video_id, input_data)
+        if semantic_recipe is not None:
+            cache_manager.save_step(video_id, "recipe", semantic_recipe)
+            return semantic_recipe
     
-    def clean_json(text: str) -> str:
-        """Remove trailing commas from JSON string"""
-        # Remove trailing commas before closing braces or brackets
-        text = re.sub(r',\s*}', '}', text)
-        text = re.sub(r',\s*]', ']', text)
-        return text
+    config_kwargs = {
+        "response_mime_type": "application/json",
+        "response_schema": RECIPE_SCHEMA,
+    }
+    cache_name = _get_recipe_prompt_cache() if GEMINI_RECIPE_CACHE_ENABLED else None
+    if cache_name:
+        # The static prompt prefix is already in the cached content
+        prompt = _dumps(input_data)
+        config_kwargs["cached_content"] = cache_name
+    else:
+        prompt = recipe_extraction.RECIPE_EXTRACTION_PROMPT_PREFIX + _dumps(input_data)
     
     try:
-        print("DEBUG: Sending request to Gemini...")
-        response = client.models.generate_content(
-            model='models/gemini-2.5-flash',
+        logger.debug("Sending request to Gemini...")
+        recipe, json_text = _generate_json_streamed(
+            model=_RECIPE_MODEL,
             contents=prompt,
+            config=types.GenerateContentConfig(**config_kwargs),
         )
-        print("DEBUG: Received response from Gemini")
-        
-        # Extract JSON from response
-        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-        matches = re.findall(json_pattern, response.text, re.DOTALL)
-        
-        json_text = None
-        if matches:
-            print("DEBUG: Found JSON block in response")
-            json_text = matches[0]
-        else:
-            print("DEBUG: No JSON block found, trying to parse full text")
-            json_text = response.text
-        
-        # Clean and parse JSON
-        json_text = clean_json(json_text)
-        print(f"DEBUG: Parsing JSON (first 200 chars): {json_text[:200]}")
+        logger.debug("Received response from Gemini")
+        if recipe is None:
+            recipe = _parse_recipe_text(json_text)
         
-        try:
-            recipe = json.loads(json_text)
-            cache_manager.save_step(video_id, "recipe", recipe)
-            return recipe
-        except json.JSONDecodeError as je:
-            print(f"DEBUG: JSON parse error at position {je.pos}: {je.msg}")
-            print(f"DEBUG: Context around error: {json_text[max(0, je.pos-50):je.pos+50]}")
-            raise
+        cache_manager.save_step(video_id, "recipe", recipe)
+        _persist_in_background(cache_manager.save_blob, _RECIPE_CACHE_NAMESPACE, content_key, recipe)
+        if semantic_embedding is not None:
+            _persist_in_background(semantic_cache.store, _RECIPE_CACHE_NAMESPACE, semantic_embedding, video_id, recipe)
+        return recipe
             
     except Exception as e:
-        print(f"DEBUG: Gemini extraction failed: {e}")
+        logger.debug("Gemini extraction failed: %s", e)
+        raise e
+
+
+async def aextract_recipe_gemini(input_data: dict, video_url: str, force_regenerate: bool = False) -> dict:
+    """extract_recipe_gemini off the event loop, for async endpoints"""
+    return await asyncio.to_thread(extract_recipe_gemini, input_data, video_url, force_regenerate)
+
+
+# Extract the recipe from the video itself (Gemini watches it, as for
+# timestamps) so no transcript has to be fetched. Off by default; the
+# transcript path remains the fallback.
+RECIPE_FROM_VIDEO_ENABLED = os.getenv("RECIPE_FROM_VIDEO_ENABLED", "false").lower() == "true"
+
+
+def extract_recipe_gemini_from_video(video_url: str, metadata: dict, force_regenerate: bool = False) -> dict:
+    """
+    Extract structured recipe using Gemini with the YouTube video attached
+    instead of its transcript. Title and description are still sent, since
+    descriptions often list the exact ingredient quantities.
+    """
+    logger.debug("Starting Gemini recipe extraction from video...")
+    
+    video_id = get_video_id(video_url)
+    if not force_regenerate:
+        cached_recipe = cache_manager.load_step(video_id, "recipe")
+        if cached_recipe:
+            return cached_recipe
+    
+    input_data = {"title": metadata.get("title"), "description": metadata.get("description")}
+    prompt = (
+        recipe_extraction.RECIPE_EXTRACTION_PROMPT_PREFIX
+        + _dumps(input_data)
+        + recipe_extraction.RECIPE_FROM_VIDEO_NOTE
+    )
+    
+    try:
+        logger.debug("Sending video request to Gemini...")
+        recipe, json_text = _generate_json_streamed(
+            model=_RECIPE_MODEL,
+            contents=types.Content(parts=[_youtube_part(video_id), types.Part(text=prompt)]),
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=RECIPE_SCHEMA,
+            ),
+        )
+        logger.debug("Received video recipe response from Gemini")
+        if recipe is None:
+            recipe = _parse_recipe_text(json_text)
+        
+        cache_manager.save_step(video_id, "recipe", recipe)
+        return recipe
+    
+    except Exception as e:
+        logger.debug("Gemini video recipe extraction failed: %s", e)
         raise e
 
 
-def extract_timestamps_gemini(video_url: str, key_steps: dict) -> dict:
-    """Extract timestamps for key steps using Gemini with video"""
+async def aextract_recipe_gemini_from_video(video_url: str, metadata: dict, force_regenerate: bool = False) -> dict:
+    """extract_recipe_gemini_from_video off the event loop, for async endpoints"""
+    return await asyncio.to_thread(extract_recipe_gemini_from_video, video_url, metadata, force_regenerate)
+
+
+async def aget_video_metadata(url: str) -> dict:
+    """get_video_metadata off the event loop, for async endpoints"""
+    return await asyncio.to_thread(get_video_metadata, url)
+
+
+@functools.lru_cache(maxsize=2)
+def get_timestamp_prompt_static_tokens(include_example: bool = timestamp_extraction.INCLUDE_EXAMPLE) -> int:
+    """
+    Token count of the static timestamp prompt prefix, computed once per process.
+    Budget checks can add the (small) per-request step list count to this instead
+    of re-tokenizing the whole prompt.
+    """
+    result = client.models.count_tokens(
+        model='models/gemini-2.5-flash',
+        contents=timestamp_extraction.get_system_instruction(include_example),
+    )
+    return result.total_tokens
+
+
+# Gemini 2.5 Flash only applies implicit prompt caching to prefixes of at least
+# 1024 tokens; keep some margin so small edits don't silently disable caching.
+MIN_CACHEABLE_PREFIX_TOKENS = 1100
+
+
+def validate_timestamp_prompt_size() -> bool:
+    """
+    Check that the static timestamp prompt is large enough to be cached and that
+    its leading block is unchanged. Logs a warning and returns False otherwise.
+    """
+    ok = True
+    static_tokens = get_timestamp_prompt_static_tokens()
+    if static_tokens < MIN_CACHEABLE_PREFIX_TOKENS:
+        logger.warning(
+            "Static timestamp prompt is %s tokens, below the %s-token minimum for prompt caching",
+            static_tokens, MIN_CACHEABLE_PREFIX_TOKENS,
+        )
+        ok = False
+    if not timestamp_extraction.prefix_snapshot_matches():
+        logger.warning("Leading block of the timestamp prompt changed; update PREFIX_SNAPSHOT_SHA1 if intended")
+        ok = False
+    logger.debug("Static timestamp prompt is %s tokens", static_tokens)
+    return ok
+
+
+# Opt-in because it costs a count_tokens API call at startup
+if os.getenv("VALIDATE_PROMPT_SIZE"):
+    validate_timestamp_prompt_size()
+
+
+# Structured output schema for the dish description call
+_DISH_DESCRIPTION_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={"dish_description": types.Schema(type=types.Type.STRING)},
+    required=["dish_description"],
+)
+
+
+def _timestamp_schema(step_keys: List[str]) -> types.Schema:
+    """
+    Structured output schema for the timestamp call: one nullable time range per
+    step key, then dish_visual as the last key.
+    """
+    keys = list(step_keys) + ["dish_visual"]
+    return types.Schema(
+        type=types.Type.OBJECT,
+        properties={key: types.Schema(type=types.Type.STRING, nullable=True) for key in keys},
+        required=keys,
+        property_ordering=keys,
+    )
+
+
+# Minimum cosine similarity for reusing a near-duplicate video's response
+SEMANTIC_MATCH_THRESHOLD = float(os.getenv("SEMANTIC_MATCH_THRESHOLD", "0.95"))
+# Namespaced by prompt version so a prompt edit starts a fresh index
+_SEMANTIC_TIMESTAMPS_NAMESPACE = f"timestamps_{timestamp_extraction.TIMESTAMP_EXTRACTION_PROMPT_VERSION}"
+
+
+def _embed_text(text: str) -> List[float]:
+    """Embed text with Gemini for semantic cache lookups"""
+    result = client.models.embed_content(model='models/text-embedding-004', contents=text)
+    return result.embeddings[0].values
+
+
+def _semantic_timestamps_lookup(video_id: str, key_steps: dict, metadata: dict) -> tuple:
+    """
+    Look up timestamps from a near-duplicate video.
+
+    Returns:
+        (embedding, timestamps) - embedding is None if embedding failed, and
+        timestamps is None unless a usable match was found
+    """
+    text = " ".join(
+        [metadata.get("title") or "", metadata.get("channel_name") or ""]
+        + [key_steps[key] for key in sorted(key_steps)]
+    )
+    try:
+        embedding = _embed_text(text)
+    except Exception as e:
+        logger.debug("Semantic cache embedding failed: %s", e)
+        return None, None
     
-    # Extract video ID and check cache
-    video_id = video_url.split("v=")[-1].split("&")[0]
-    cached_timestamps = cache_manager.load_step(video_id, "timestamps")
+    match = semantic_cache.lookup(_SEMANTIC_TIMESTAMPS_NAMESPACE, embedding, exclude_key=video_id)
+    if not match or match[0] < SEMANTIC_MATCH_THRESHOLD:
+        return embedding, None
+    similarity, matched_video_id, timestamps = match
+    
+    # The match must cover the same step keys and fit inside this video
+    if not all(key in timestamps for key in key_steps):
+        return embedding, None
+    duration = metadata.get("duration")
+    dish_visual = timestamps.get("dish_visual")
+    if duration and dish_visual and dish_visual != "null":
+        try:
+            if timestamp_to_seconds(dish_visual.split('-')[-1]) > duration:
+                return embedding, None
+        except ValueError:
+            return embedding, None
+    
+    logger.debug("Semantic cache hit for %s from %s (similarity %.3f)", video_id, matched_video_id, similarity)
+    return embedding, timestamps
+
+
+def _canonical_steps(steps: dict) -> str:
+    """Serialize key steps byte-stably (sorted keys, no whitespace) for prompts and cache keys"""
+    return _dumps_canonical(steps)
+
+
+def _notify_timestamps(on_timestamps: Optional[Callable[[dict], None]], timestamps: dict) -> None:
+    """
+    Run the on_timestamps callback. Its failure is logged, not raised, so it
+    cannot stop the timestamps and description from being cached.
+    """
+    if on_timestamps is None:
+        return
+    try:
+        on_timestamps(timestamps)
+    except Exception as e:
+        logger.warning("on_timestamps callback failed: %s", e)
+
+
+def extract_timestamps_gemini(
+    video_url: str,
+    key_steps: dict,
+    on_timestamps: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Extract timestamps for key steps using Gemini with video.
+    
+    Args:
+        video_url: YouTube video URL
+        key_steps: Dict of {step_number: instruction}
+        on_timestamps: Optional callback invoked with the step/dish_visual
+            timestamps as soon as they are available, while the (much slower)
+            dish description is still being generated
+        
+    Returns:
+        Dict of step timestamps plus dish_visual and dish_description
+    """
+    
+    # Extract video ID and check cache. Responses are keyed on the step list as
+    # well, so re-runs with the same steps skip Gemini entirely while a changed
+    # step list still gets fresh timestamps.
+    video_id = get_video_id(video_url)
+    key_steps_json = _canonical_steps(key_steps)
+    steps_hash = hashlib.sha256(key_steps_json.encode("utf-8")).hexdigest()[:16]
+    cache_key = f"timestamps_{timestamp_extraction.TIMESTAMP_EXTRACTION_PROMPT_VERSION}_{steps_hash}"
+    cached_timestamps = cache_manager.load_step(video_id, cache_key)
+    if not cached_timestamps:
+        # Unkeyed timestamps.json (written before responses were keyed, and
+        # still updated with the latest result) is valid for the same step list
+        latest = cache_manager.load_step(video_id, "timestamps")
+        if latest and set(latest) - {"dish_visual", "dish_description"} == {str(key) for key in key_steps}:
+            cached_timestamps = latest
+            _persist_in_background(cache_manager.save_step, video_id, cache_key, latest)
     if cached_timestamps:
+        _notify_timestamps(on_timestamps, cached_timestamps)
         return cached_timestamps
     
-    key_steps_json = json.dumps(key_steps)
-    
-    prompt = timestamp_extraction.TIMESTAMP_EXTRACTION_PROMPT.format(key_steps_json=key_steps_json)
+    # Near-duplicate videos (re-uploads, mirrors) can reuse another video's result
+    semantic_embedding = None
+    if semantic_cache.SEMANTIC_CACHE_ENABLED:
+        # Only title and channel go into the embedding (duration is an optional check)
+        try:
+            metadata = get_video_metadata(video_url, fields=frozenset({"title", "channel_name"}))
+        except Exception as e:
+            logger.debug("Metadata for semantic lookup unavailable: %s", e)
+            metadata = {}
+        semantic_embedding, semantic_timestamps = _semantic_timestamps_lookup(video_id, key_steps, metadata)
+        if semantic_timestamps:
+            _persist_in_background(cache_manager.save_step, video_id, cache_key, semantic_timestamps)
+            cache_manager.save_step(video_id, "timestamps", semantic_timestamps)
+            _notify_timestamps(on_timestamps, semantic_timestamps)
+            return semantic_timestamps
     
-    print("DEBUG: Sending video to Gemini for timestamp analysis...")
-    video_id = video_url.split("v=")[-1].split("&")[0]
+    logger.debug("Sending video to Gemini for timestamp analysis...")
     
     try:
-        response = client.models.generate_content(
-            model='models/gemini-2.5-flash',
-            contents=types.Content(
-                parts=[
-                    types.Part(
-                        file_data=types.FileData(file_uri=f'https://www.youtube.com/watch?v={video_id}')
-                    ),
-                    types.Part(text=prompt)
-                ]
+        # Timestamps and the (much longer) dish description are independent, so
+        # request them concurrently: wall-clock is max(t_a, t_b) instead of the sum.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            timestamps_future = executor.submit(
+                _analyze_video_json,
+                video_id,
+                timestamp_extraction.get_system_segments(),
+                timestamp_extraction.build_prompt(key_steps_json),
+                _timestamp_schema(sorted(key_steps)),
             )
-        )
-        
-        print("DEBUG: Received timestamp response from Gemini")
-        
-        # Extract JSON from response
-        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-        matches = re.findall(json_pattern, response.text, re.DOTALL)
+            description_future = executor.submit(
+                _analyze_video_json,
+                video_id,
+                timestamp_extraction.get_dish_description_segments(),
+                timestamp_extraction.DISH_DESCRIPTION_REQUEST,
+                _DISH_DESCRIPTION_SCHEMA,
+            )
+            timestamps = timestamps_future.result()
+            # Let the caller start on the timestamps (e.g. frame extraction)
+            # while the description is still generating
+            _notify_timestamps(on_timestamps, dict(timestamps))
+            try:
+                dish_description = description_future.result().get("dish_description")
+            except Exception as e:
+                # The description is informational only; keep the timestamps
+                logger.debug("Dish description extraction failed: %s", e)
+                dish_description = None
         
-        if matches:
-            timestamps = json.loads(matches[0])
-            print(f"DEBUG: Extracted timestamps: {timestamps}")
-            cache_manager.save_step(video_id, "timestamps", timestamps)
-            return timestamps
-        else:
-            # Try to parse the entire response as JSON
-            timestamps = json.loads(response.text)
-            print(f"DEBUG: Extracted timestamps: {timestamps}")
-            cache_manager.save_step(video_id, "timestamps", timestamps)
-            return timestamps
+        if dish_description:
+            timestamps["dish_description"] = dish_description
+        logger.debug("Extracted timestamps: %s", timestamps)
+        # "timestamps" holds the latest result for the PDF/pipeline status
+        _persist_in_background(cache_manager.save_step, video_id, cache_key, timestamps)
+        cache_manager.save_step(video_id, "timestamps", timestamps)
+        if semantic_embedding:
+            _persist_in_background(semantic_cache.store, _SEMANTIC_TIMESTAMPS_NAMESPACE, semantic_embedding, video_id, timestamps)
+        return timestamps
             
     except Exception as e:
-        print(f"DEBUG: Timestamp extraction failed: {e}")
+        logger.debug("Timestamp extraction failed: %s", e)
         raise e
 
 
-def timestamp_to_seconds(timestamp: str) -> float:
-    """Convert timestamp string to seconds"""
-    parts = timestamp.split(':')
-    if len(parts) == 3:
-        return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-    elif len(parts) == 2:
-        return int(parts[0]) * 60 + int(parts[1])
+async def aextract_timestamps_gemini(
+    video_url: str,
+    key_steps: dict,
+    on_timestamps: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """extract_timestamps_gemini off the event loop, for async endpoints"""
+    return await asyncio.to_thread(extract_timestamps_gemini, video_url, key_steps, on_timestamps)
+
+
+@functools.lru_cache(maxsize=8)
+def _system_instruction_content(system_segments: tuple) -> types.Content:
+    """Build the static system instruction Content once per process and reuse it"""
+    return types.Content(parts=[types.Part(text=segment) for segment in system_segments])
+
+
+# Gemini explicit context caching for the video + shared prompt head. Off by
+# default: cached content is billed for storage while it lives.
+GEMINI_VIDEO_CACHE_ENABLED = os.getenv("GEMINI_VIDEO_CACHE_ENABLED", "false").lower() == "true"
+GEMINI_VIDEO_CACHE_TTL_SECONDS = 3600
+
+# {video_id: (cached_content_name, expires_at)}
+_video_caches: Dict[str, tuple] = {}
+_video_caches_lock = threading.Lock()
+# One lock per video, so a slow create call only holds up requests for that video
+_video_cache_locks: Dict[str, threading.Lock] = {}
+
+
+def _youtube_part(video_id: str) -> types.Part:
+    return types.Part(file_data=types.FileData(file_uri=f'https://www.youtube.com/watch?v={video_id}'))
+
+
+def _get_video_cache(video_id: str) -> Optional[str]:
+    """
+    Return the name of a Gemini cached-content object holding this video and the
+    shared prompt head, creating it on first use. Later queries against the same
+    video then skip the video ingestion/prefill. Returns None if caching fails.
+    """
+    # Leave a minute of headroom so the cache doesn't expire mid-request
+    entry = _video_caches.get(video_id)
+    if entry and entry[1] > time.time() + 60:
+        return entry[0]
+    with _video_caches_lock:
+        video_lock = _video_cache_locks.setdefault(video_id, threading.Lock())
+    with video_lock:
+        # Created by another request while this one waited
+        entry = _video_caches.get(video_id)
+        if entry and entry[1] > time.time() + 60:
+            return entry[0]
+        try:
+            cached_content = client.caches.create(
+                model='models/gemini-2.5-flash',
+                config=types.CreateCachedContentConfig(
+                    contents=[types.Content(role="user", parts=[_youtube_part(video_id)])],
+                    system_instruction=timestamp_extraction.SYSTEM_PROMPT_HEAD,
+                    ttl=f"{GEMINI_VIDEO_CACHE_TTL_SECONDS}s",
+                ),
+            )
+        except Exception as e:
+            logger.debug("Gemini video cache creation failed, sending video inline: %s", e)
+            return None
+        _video_caches[video_id] = (cached_content.name, time.time() + GEMINI_VIDEO_CACHE_TTL_SECONDS)
+        logger.debug("Created Gemini video cache %s for %s", cached_content.name, video_id)
+        return cached_content.name
+
+
+def _analyze_video_json(video_id: str, system_segments: tuple, prompt: str, response_schema: types.Schema) -> dict:
+    """
+    Run one Gemini video analysis call and parse its JSON response.
+    The response is grammar-constrained to response_schema, so it is always a
+    single parseable JSON object.
+    Static instructions go in the system instruction (one part per segment) so
+    every request shares a byte-identical prefix, eligible for Gemini implicit
+    prompt caching. The video comes first in the user turn so re-runs on the
+    same video also share its tokens; the step list is last.
+    With GEMINI_VIDEO_CACHE_ENABLED, the video and prompt head come from an
+    explicit cache instead and only the call-specific text is sent.
+    """
+    config_kwargs = {
+        "temperature": 0,  # Deterministic output so cached responses stay representative
+        "response_mime_type": "application/json",
+        "response_schema": response_schema,
+    }
+    cache_name = _get_video_cache(video_id) if GEMINI_VIDEO_CACHE_ENABLED else None
+    if cache_name:
+        # A cached-content request cannot also set system_instruction, so the
+        # call-specific rules (minus the cached head) go in the user turn
+        head = timestamp_extraction.SYSTEM_PROMPT_HEAD
+        parts = [
+            types.Part(text=segment[len(head):] if segment.startswith(head) else segment)
+            for segment in system_segments
+        ]
+        contents = types.Content(role="user", parts=parts + [types.Part(text=prompt)])
+        config_kwargs["cached_content"] = cache_name
     else:
-        return float(parts[0])
+        contents = types.Content(parts=[_youtube_part(video_id), types.Part(text=prompt)])
+        config_kwargs["system_instruction"] = _system_instruction_content(system_segments)
+    
+    response = client.models.generate_content(
+        model='models/gemini-2.5-flash',
+        contents=contents,
+        config=types.GenerateContentConfig(**config_kwargs),
+    )
+    
+    logger.debug("Received video analysis response from Gemini")
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        logger.debug("Video analysis prompt tokens: %s, cached: %s", usage.prompt_token_count, usage.cached_content_token_count or 0)
+    
+    return _loads(response.text)
+
+
+@functools.lru_cache(maxsize=2048)
+def timestamp_to_seconds(timestamp: str) -> float:
+    """Convert timestamp string to seconds (memoized; the same strings recur across steps and retries)"""
+    # Single pass with one accumulator per component: no slices or int() calls.
+    # Anything besides digits and colons (fractions, spaces), and malformed input
+    # (empty components, more than H:M:S), takes the slow path, which raises
+    # ValueError where it should.
+    total = 0
+    current = 0
+    has_digit = False
+    colons = 0
+    for char in timestamp:
+        digit = ord(char) - 48
+        if 0 <= digit <= 9:
+            current = current * 10 + digit
+            has_digit = True
+        elif char == ':' and has_digit and colons < 2:
+            total = total * 60 + current
+            current = 0
+            has_digit = False
+            colons += 1
+        else:
+            return _parse_timestamp(timestamp)
+    if not has_digit:
+        return _parse_timestamp(timestamp)
+    return total * 60 + current
+
+
+def _parse_timestamp(timestamp: str) -> float:
+    """Component-wise parse for timestamps timestamp_to_seconds cannot scan"""
+    first_colon = timestamp.find(':')
+    if first_colon < 0:
+        return float(timestamp)
+    second_colon = timestamp.find(':', first_colon + 1)
+    if second_colon < 0:
+        return int(timestamp[:first_colon]) * 60 + int(timestamp[first_colon + 1:])
+    return (
+        int(timestamp[:first_colon]) * 3600
+        + int(timestamp[first_colon + 1:second_colon]) * 60
+        + int(timestamp[second_colon + 1:])
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _seconds_to_hhmmss(total_seconds: int) -> str:
+    """Format whole seconds as HH:MM:SS for ffmpeg"""
+    minutes, seconds = divmod(total_seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+# Resolved stream URLs: {video_id: {"url": ..., "expires_at": ...}}, also
+# persisted as the "stream" step so a restarted process can reuse them
+_stream_url_cache: Dict[str, dict] = {}
+_STREAM_URL_CACHE_MAX = 32
+_STREAM_URL_DEFAULT_TTL = 3600
+
+
+def _stream_url_expiry(stream_url: str) -> float:
+    """Expiry of a signed googlevideo URL (its `expire` query param), else a default TTL"""
+    match = _STREAM_EXPIRE_RE.search(stream_url)
+    if match:
+        return float(match.group(1))
+    return time.time() + _STREAM_URL_DEFAULT_TTL
+
+
+# Resolve stream URLs with a `yt-dlp -j` subprocess instead of in-process, so
+# the API process does not load yt-dlp's extractors just for frame extraction
+# and an extractor crash or hang cannot take it down. Off by default: each
+# resolve then pays interpreter startup.
+YTDLP_SUBPROCESS = os.getenv("YTDLP_SUBPROCESS", "false").lower() == "true"
+
+
+def _stream_info_subprocess(video_url: str) -> dict:
+    """yt-dlp info for _YDL_STREAM_OPTS, from the yt-dlp CLI in a child process"""
+    cmd = [
+        sys.executable, "-m", "yt_dlp", "-j", "--no-warnings",
+        "-f", _YDL_STREAM_OPTS["format"],
+        "--source-address", _YDL_STREAM_OPTS["source_address"],
+        "--retries", str(_YDL_STREAM_OPTS["retries"]),
+        "--extractor-args",
+        "youtube:player_client=" + ",".join(_YDL_STREAM_OPTS["extractor_args"]["youtube"]["player_client"]),
+    ]
+    for name, value in _YDL_STREAM_OPTS["http_headers"].items():
+        cmd += ["--add-header", f"{name}:{value}"]
+    cmd.append(video_url)
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        raise Exception("yt-dlp timed out resolving the stream URL")
+    if result.returncode != 0:
+        stderr_tail = result.stderr[-500:].decode("utf-8", errors="replace")
+        raise Exception(f"yt-dlp failed to resolve the stream URL: {stderr_tail}")
+    return _loads(result.stdout)
+
+
+def resolve_stream_url(video_url: str) -> str:
+    """
+    Resolve the direct (signed) video stream URL with yt-dlp, without downloading.
+    Results are cached per video until shortly before the signed URL expires,
+    so repeated frame extractions run the yt-dlp extractor only once, whatever
+    form of the video URL they were given.
+    """
+    video_id = get_video_id(video_url)
+    cached = _stream_url_cache.get(video_id)
+    if cached is None:
+        cached = cache_manager.load_step(video_id, "stream")
+    if cached and cached["expires_at"] > time.time() + 60:
+        _stream_url_cache[video_id] = cached
+        return cached["url"]
+    
+    logger.debug("Getting direct video URL from yt-dlp...")
+    info = _stream_info_subprocess(video_url) if YTDLP_SUBPROCESS else _extract_info(_YDL_STREAM_OPTS, video_url)
+    # Get the direct video stream URL
+    stream_url = info['url']
+    
+    if len(_stream_url_cache) >= _STREAM_URL_CACHE_MAX:
+        # Evict the oldest entry (dicts keep insertion order)
+        _stream_url_cache.pop(next(iter(_stream_url_cache)), None)
+    entry = {"url": stream_url, "expires_at": _stream_url_expiry(stream_url)}
+    _stream_url_cache[video_id] = entry
+    _persist_in_background(cache_manager.save_step, video_id, "stream", entry)
+    return stream_url
+
+
+def _forget_stream_url(video_url: str) -> None:
+    """
+    Drop a video's cached stream URL after a failed extraction. Signed URLs can
+    be rejected before they expire (e.g. bound to another egress IP after a
+    restart), so the next attempt resolves a fresh one.
+    """
+    video_id = get_video_id(video_url)
+    _stream_url_cache.pop(video_id, None)
+    cache_manager.clear_step(video_id, "stream")
+
+
+# ffmpeg is run without a shell, with binary pipes; stderr is only decoded on
+# failure, and limiting it to errors keeps the captured buffer to a few lines
+_FFMPEG_QUIET_ARGS = ("-hide_banner", "-loglevel", "error", "-nostdin")
+
+# Per-input option: snap to the keyframe before the seek point instead of
+# decoding forward to the exact time. A keyframe or two off is fine for a step
+# snapshot, and dish_visual is already a multi-second range.
+_FFMPEG_SEEK_ARGS = ["-noaccurate_seek"]
+
+# Hardware decoder for frame extraction. Unset: probe `ffmpeg -hwaccels` once
+# and use the first preferred method it was built with; "none" disables it.
+FFMPEG_HWACCEL = os.getenv("FFMPEG_HWACCEL")
+_PREFERRED_HWACCELS = ("cuda", "videotoolbox", "vaapi", "qsv")
+# Set once a hardware-decoded run failed where software decoding succeeded
+_hwaccel_unusable = False
+
+# ffmpeg JPEG quality scale for frames (2 = best, 31 = worst). 5 looks the same
+# as 2 for step snapshots and encodes faster into smaller files.
+try:
+    _frame_qscale = max(2, min(31, int(os.getenv("FRAME_JPEG_QSCALE", "5"))))
+except ValueError:
+    logger.warning("Invalid FRAME_JPEG_QSCALE %r, using 5", os.getenv("FRAME_JPEG_QSCALE"))
+    _frame_qscale = 5
+FRAME_JPEG_QSCALE = str(_frame_qscale)
+# Pillow quality (PyAV path) roughly equivalent to the ffmpeg scale: 2 -> 94, 5 -> 85
+_FRAME_JPEG_QUALITY = 100 - 3 * _frame_qscale
+
+
+@functools.lru_cache(maxsize=1)
+def _hwaccel() -> Optional[str]:
+    """Hardware decoding method to pass to -hwaccel, or None for software decoding"""
+    if FFMPEG_HWACCEL:
+        return None if FFMPEG_HWACCEL == "none" else FFMPEG_HWACCEL
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-hwaccels"], capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    available = set(result.stdout.decode("utf-8", errors="replace").split())
+    hwaccel = next((method for method in _PREFERRED_HWACCELS if method in available), None)
+    logger.debug("ffmpeg hardware decoding: %s", hwaccel or "unavailable")
+    return hwaccel
+
+
+def _run_ffmpeg(build_cmd: Callable[[List[str]], List[str]], timeout: float) -> subprocess.CompletedProcess:
+    """
+    Run an ffmpeg command; build_cmd receives the per-input options to place
+    before each -i. A method being compiled in does not mean the device exists,
+    so a failed hardware-decoded run is retried once in software, and if that
+    succeeds hardware decoding is skipped for the rest of the process.
+    """
+    global _hwaccel_unusable
+    hwaccel = None if _hwaccel_unusable else _hwaccel()
+    input_args = ["-hwaccel", hwaccel, *_FFMPEG_SEEK_ARGS] if hwaccel else _FFMPEG_SEEK_ARGS
+    result = subprocess.run(build_cmd(input_args), capture_output=True, timeout=timeout)
+    if result.returncode != 0 and hwaccel:
+        logger.debug("ffmpeg failed with -hwaccel %s, retrying with software decoding", hwaccel)
+        result = subprocess.run(build_cmd(_FFMPEG_SEEK_ARGS), capture_output=True, timeout=timeout)
+        if result.returncode == 0:
+            logger.warning("Hardware decoding (%s) failed where software worked; disabling it", hwaccel)
+            _hwaccel_unusable = True
+    return result
+
+
+def _decode_frame_pyav(direct_url: str, timestamp_seconds: float) -> Optional[bytes]:
+    """
+    Extract one frame in-process with PyAV. The stream is still opened and probed
+    per call, but there is no ffmpeg process to spawn or pipes to drain, which is
+    most of the fixed cost of a keyframe grab. The seek snaps to the previous
+    keyframe, like -noaccurate_seek on the subprocess path.
+    """
+    with av.open(direct_url, timeout=30) as container:
+        stream = container.streams.video[0]
+        container.seek(int(int(timestamp_seconds) / stream.time_base), stream=stream)
+        frame = next(container.decode(stream), None)
+        if frame is None:
+            return None
+        buffer = io.BytesIO()
+        frame.to_image().save(buffer, format="JPEG", quality=_FRAME_JPEG_QUALITY)
+        return buffer.getvalue()
+
+
+def _try_decode_frame_pyav(direct_url: str, timestamp_seconds: float) -> Optional[bytes]:
+    """PyAV frame, or None when PyAV is not installed or failed (use ffmpeg instead)"""
+    if av is None:
+        return None
+    try:
+        return _decode_frame_pyav(direct_url, timestamp_seconds)
+    except Exception as e:
+        logger.debug("PyAV frame extraction failed, falling back to ffmpeg: %s", str(e))
+        return None
 
 
 def extract_frame_at_time(video_url: str, timestamp_seconds: float) -> bytes:
@@ -453,128 +1633,130 @@ def extract_frame_at_time(video_url: str, timestamp_seconds: float) -> bytes:
     This method doesn't download the entire video - it gets the direct stream URL
     and uses ffmpeg to seek to the exact timestamp, which is much more efficient.
     """
-    print(f"DEBUG: Extracting frame at {timestamp_seconds}s...")
+    logger.debug("Extracting frame at %ss...", timestamp_seconds)
     
     # Convert seconds to HH:MM:SS format for ffmpeg
-    hours = int(timestamp_seconds // 3600)
-    minutes = int((timestamp_seconds % 3600) // 60)
-    seconds = int(timestamp_seconds % 60)
-    timestamp_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
-    tmp_dir = tempfile.mkdtemp(prefix="frame_extract_")
-    frame_path = os.path.join(tmp_dir, "frame.jpg")
+    timestamp_str = _seconds_to_hhmmss(int(timestamp_seconds))
 
     try:
         # Step 1: Get direct video URL using yt-dlp (without downloading)
-        print("DEBUG: Getting direct video URL from yt-dlp...")
-        ydl_opts = {
-            "format": 'bestvideo[ext=mp4]/best[ext=mp4]/best',
-            "quiet": True,
-            "no_warnings": True,
-            # Add options to bypass YouTube restrictions
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-us,en;q=0.5",
-                "Sec-Fetch-Mode": "navigate",
-            },
-            "source_address": "0.0.0.0",
-            "retries": 10,
-            "fragment_retries": 10,
-            "extractor_args": {"youtube": {"player_client": ["android", "web"]}},
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
-            # Get the direct video stream URL
-            direct_url = info['url']
+        direct_url = resolve_stream_url(video_url)
         
-        print(f"DEBUG: Got direct URL, extracting frame at {timestamp_str}...")
+        logger.debug("Got direct URL, extracting frame at %s...", timestamp_str)
+
+        frame_data = _try_decode_frame_pyav(direct_url, timestamp_seconds)
+        if frame_data:
+            return frame_data
 
         # Step 2: Use ffmpeg to extract frame directly from the stream URL
-        # Using -ss before -i for faster seeking
-        ffmpeg_cmd = [
-            "ffmpeg",
-            "-ss", timestamp_str,          # Seek before input (faster)
-            "-i", direct_url,               # Direct stream URL
-            "-frames:v", "1",               # Extract 1 frame
-            "-q:v", "2",                    # High quality
-            "-y",                           # Overwrite output
-            frame_path,
-        ]
+        # Using -ss before -i for faster seeking; the JPEG is written to stdout
+        # so there is no temp file round-trip. The input seek fetches only the
+        # segment around the timestamp, where a select='eq(n,...)' filter would
+        # read and decode the stream from the start up to the frame.
+        def ffmpeg_cmd(input_args: List[str]) -> List[str]:
+            return [
+                "ffmpeg",
+                *_FFMPEG_QUIET_ARGS,
+                *input_args,                    # Keyframe seek, hardware decode if available
+                "-ss", timestamp_str,          # Seek before input (faster)
+                "-i", direct_url,               # Direct stream URL
+                "-frames:v", "1",               # Extract 1 frame
+                "-an", "-sn",                   # No audio/subtitle output (muxed fallback formats)
+                "-q:v", FRAME_JPEG_QSCALE,      # JPEG quality
+                "-f", "image2pipe",             # Image muxer for a pipe output
+                "-vcodec", "mjpeg",             # JPEG encoding
+                "pipe:1",                       # Write to stdout
+            ]
 
-        result = subprocess.run(
-            ffmpeg_cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,  # Shorter timeout since we're not downloading entire video
-        )
+        # Shorter timeout since we're not downloading entire video
+        result = _run_ffmpeg(ffmpeg_cmd, timeout=30)
 
         if result.returncode != 0:
             # Check for common errors
-            stderr_tail = result.stderr[-500:] if result.stderr else ""
-            print(f"DEBUG: ffmpeg failed: {stderr_tail}")
+            stderr_tail = result.stderr[-500:].decode("utf-8", errors="replace") if result.stderr else ""
+            logger.debug("ffmpeg failed: %s", stderr_tail)
             raise Exception(f"ffmpeg failed to extract frame: {stderr_tail}")
 
-        if os.path.exists(frame_path) and os.path.getsize(frame_path) > 0:
-            file_size = os.path.getsize(frame_path)
-            print(f"DEBUG: Frame extracted successfully ({file_size} bytes)")
-            with open(frame_path, "rb") as f:
-                return f.read()
-
-        raise Exception("Frame file was not created or is empty")
+        frame_data = result.stdout
+        if not frame_data:
+            raise Exception("ffmpeg produced no frame")
+        logger.debug("Frame extracted successfully (%s bytes)", len(frame_data))
+        return frame_data
 
     except subprocess.TimeoutExpired:
-        print("DEBUG: ffmpeg command timed out")
+        logger.debug("ffmpeg command timed out")
         raise Exception("Frame extraction timed out")
     except Exception as e:
-        print(f"DEBUG: Extraction error: {str(e)}")
+        logger.debug("Extraction error: %s", str(e))
         raise
-    finally:
-        # Clean up temp files
-        try:
-            if os.path.exists(frame_path):
-                os.remove(frame_path)
-            if os.path.exists(tmp_dir):
-                os.rmdir(tmp_dir)
-        except Exception as cleanup_error:
-            print(f"DEBUG: Cleanup warning: {cleanup_error}")
 
 
-def extract_best_frame(video_url: str, timestamp: str, step_instruction: str, step_number: str) -> str:
-    """
-    Extract frame at the given timestamp or time range.
-    Returns base64 encoded image.
-    """
-    print(f"DEBUG: Extracting frame for step {step_number}: {step_instruction[:50]}...")
-    
-    # Extract video ID and check cache
-    video_id = video_url.split("v=")[-1].split("&")[0]
-    cached_frame = cache_manager.load_frame(video_id, step_number)
-    if cached_frame:
-        frame_base64 = base64.b64encode(cached_frame).decode('utf-8')
-        return frame_base64
-    
+def _frame_seconds(timestamp: str) -> float:
+    """Seconds to capture for a timestamp; for a range (e.g. "1:23-1:28") use its middle"""
     # Check if timestamp is a range (e.g., "1:23-1:28")
-    if '-' in timestamp and timestamp.count('-') == 1:
+    range_match = _TIMESTAMP_RANGE_RE.match(timestamp)
+    if range_match:
         # Parse time range
-        start_time, end_time = timestamp.split('-')
+        start_time, end_time = range_match.groups()
         start_seconds = timestamp_to_seconds(start_time)
         end_seconds = timestamp_to_seconds(end_time)
         
         # Extract from the middle of the range for best results
         timestamp_seconds = (start_seconds + end_seconds) / 2
-        print(f"DEBUG: Time range {timestamp} -> extracting at middle: {timestamp_seconds}s")
-    else:
-        # Single timestamp
-        timestamp_seconds = timestamp_to_seconds(timestamp)
+        logger.debug("Time range %s -> extracting at middle: %ss", timestamp, timestamp_seconds)
+        return timestamp_seconds
+    # Single timestamp
+    return timestamp_to_seconds(timestamp)
+
+
+def extract_best_frame_bytes(video_url: str, timestamp: str, step_instruction: str, step_number: str) -> Optional[bytes]:
+    """
+    Extract the JPEG frame at the given timestamp or time range, cache-first.
+    Returns the raw image bytes, or None if extraction failed.
+    """
+    logger.debug("Extracting frame for step %s: %s...", step_number, step_instruction[:50])
+    
+    # Extract video ID and check cache
+    video_id = get_video_id(video_url)
+    cached_frame = cache_manager.load_frame(video_id, step_number)
+    if cached_frame:
+        return cached_frame
+    
+    try:
+        timestamp_seconds = _frame_seconds(timestamp)
+    except ValueError as e:
+        logger.debug("Invalid frame timestamp %r: %s", timestamp, e)
+        return None
+    failure_key = f"frame_{int(timestamp_seconds)}"
+    if _recently_failed(video_id, failure_key):
+        logger.debug("Frame at %ss recently failed, not retrying yet", int(timestamp_seconds))
+        return None
     
     try:
         frame_data = extract_frame_at_time(video_url, timestamp_seconds)
-        # Save to cache
-        cache_manager.save_frame(video_id, step_number, frame_data)
-        frame_base64 = base64.b64encode(frame_data).decode('utf-8')
-        return frame_base64
     except Exception as e:
-        print(f"DEBUG: Failed to extract frame: {e}")
+        logger.debug("Failed to extract frame: %s", e)
+        # The stream URL may be stale; retry once with a freshly resolved one
+        # and only then remember the failure
+        _forget_stream_url(video_url)
+        try:
+            frame_data = extract_frame_at_time(video_url, timestamp_seconds)
+        except Exception as retry_e:
+            logger.debug("Frame extraction with a fresh stream URL failed: %s", retry_e)
+            _remember_failure(video_id, failure_key)
+            return None
+    # Save to cache
+    cache_manager.save_frame(video_id, step_number, frame_data)
+    return frame_data
+
+
+def extract_best_frame(video_url: str, timestamp: str, step_instruction: str, step_number: str) -> Optional[str]:
+    """
+    extract_best_frame_bytes, base64 encoded for JSON responses.
+    Callers that only need the frame cached, or serve it as image/jpeg, should
+    use extract_best_frame_bytes and skip the encode.
+    """
+    frame_data = extract_best_frame_bytes(video_url, timestamp, step_instruction, step_number)
+    if frame_data is None:
         return None
+    return base64.b64encode(frame_data).decode('ascii')
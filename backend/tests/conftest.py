@@ -0,0 +1,27 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+# Tests import the backend modules directly, as main.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# services creates its Gemini client at import time; no request is made
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the cache at a temporary directory, with empty in-memory caches"""
+    import cache_manager
+    monkeypatch.setattr(cache_manager, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(cache_manager, "CONTENT_CACHE_DIR", tmp_path / "content_cache")
+    monkeypatch.setattr(cache_manager, "_step_memory", OrderedDict())
+    monkeypatch.setattr(cache_manager, "_frame_memory", OrderedDict())
+    monkeypatch.setattr(cache_manager, "_frame_memory_bytes", 0)
+    monkeypatch.setattr(cache_manager, "CACHE_DB_PATH", tmp_path / "cache.db")
+    monkeypatch.setattr(cache_manager, "_sqlite_local", threading.local())
+    return tmp_path / "cache"
@@ -0,0 +1,83 @@
+import os
+import time
+import sqlite3
+
+import cache_manager
+
+
+def test_load_step_returns_a_fresh_object(cache_dir):
+    cache_manager.save_step("vid", "recipe", {"title": "Soup"})
+    cache_manager.load_step("vid", "recipe")["title"] = "Stew"
+    assert cache_manager.load_step("vid", "recipe") == {"title": "Soup"}
+
+
+def test_step_memory_evicts_least_recently_used(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache_manager, "_MEMORY_MAX_STEPS", 2)
+    cache_manager.save_step("vid", "metadata", {})
+    cache_manager.save_step("vid", "transcript", [])
+    cache_manager.load_step("vid", "metadata")
+    cache_manager.save_step("vid", "recipe", {})
+    assert list(cache_manager._step_memory) == [("vid", "metadata"), ("vid", "recipe")]
+
+
+def test_frame_memory_evicts_by_byte_budget(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache_manager, "_MEMORY_MAX_FRAME_BYTES", 10)
+    cache_manager.save_frame("vid", "1", b"a" * 4)
+    cache_manager.save_frame("vid", "2", b"b" * 4)
+    cache_manager.load_frame("vid", "1")
+    cache_manager.save_frame("vid", "3", b"c" * 4)
+    assert list(cache_manager._frame_memory) == [("vid", "1"), ("vid", "3")]
+    assert cache_manager._frame_memory_bytes == 8
+
+
+def test_clear_step_drops_keyed_variants_from_memory(cache_dir):
+    cache_manager.save_step("vid", "timestamps", {"1": "0:10"})
+    cache_manager.save_step("vid", "timestamps_abc", {"1": "0:12"})
+    cache_manager.clear_step("vid", "timestamps")
+    assert cache_manager.load_step("vid", "timestamps") is None
+    assert cache_manager.load_step("vid", "timestamps_abc") is None
+
+
+def _make_old(path, days):
+    mtime = time.time() - days * 86400
+    os.utime(path, (mtime, mtime))
+
+
+def test_sweep_removes_only_old_keyed_steps(cache_dir):
+    for step in ("recipe", "metadata", "timestamps", "timestamps_v1_abc"):
+        cache_manager.save_step("vid", step, {})
+        _make_old(cache_dir / "vid" / f"{step}.json", 40)
+    cache_manager.save_step("vid", "timestamps_v2_def", {})
+    assert cache_manager.sweep(30) == 1
+    assert sorted(path.name for path in (cache_dir / "vid").iterdir()) == [
+        "metadata.json", "recipe.json", "timestamps.json", "timestamps_v2_def.json",
+    ]
+    assert cache_manager.load_step("vid", "timestamps_v1_abc") is None
+
+
+def test_sweep_removes_old_content_cache_blobs(cache_dir):
+    cache_manager.save_blob("recipe", "old", {})
+    cache_manager.save_blob("recipe", "new", {})
+    _make_old(cache_manager.CONTENT_CACHE_DIR / "recipe" / "old.json", 40)
+    assert cache_manager.sweep(30) == 1
+    assert cache_manager.load_blob("recipe", "old") is None
+    assert cache_manager.load_blob("recipe", "new") == {}
+
+
+def test_sqlite_store_serves_a_step_without_its_file(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache_manager, "CACHE_SQLITE_ENABLED", True)
+    cache_manager.save_step("vid", "metadata", {"title": "Soup"})
+    (cache_dir / "vid" / "metadata.json").unlink()
+    cache_manager._forget("vid")
+    assert cache_manager.load_step("vid", "metadata") == {"title": "Soup"}
+
+
+def test_sqlite_errors_fall_back_to_the_file(cache_dir, monkeypatch):
+    def locked_db():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache_manager, "CACHE_SQLITE_ENABLED", True)
+    monkeypatch.setattr(cache_manager, "_db", locked_db)
+    cache_manager.save_step("vid", "metadata", {"title": "Soup"})
+    cache_manager._forget("vid")
+    assert cache_manager.load_step("vid", "metadata") == {"title": "Soup"}
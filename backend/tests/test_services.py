@@ -0,0 +1,125 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+import cache_manager
+import services
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=42s",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ",
+])
+def test_get_video_id(url):
+    assert services.get_video_id(url) == "dQw4w9WgXcQ"
+
+
+def test_get_video_id_rejects_url_without_id():
+    with pytest.raises(ValueError):
+        services.get_video_id("https://www.youtube.com/@somechannel")
+
+
+def test_size_limited_reader_reads_up_to_limit():
+    reader = services._SizeLimitedReader(io.BytesIO(b"x" * 10), 10)
+    assert reader.read(4) == b"xxxx"
+    assert reader.read() == b"x" * 6
+
+
+def test_size_limited_reader_raises_past_limit():
+    reader = services._SizeLimitedReader(io.BytesIO(b"x" * 11), 10)
+    reader.read(10)
+    with pytest.raises(services.SubtitleTooLargeError):
+        reader.read(1)
+
+
+def test_parse_vtt_cues():
+    content = (
+        b"WEBVTT\nKind: captions\n\n"
+        b"00:00:00.000 --> 00:00:01.000 align:start\n<c>hello</c> there\n\n"
+        b"00:00:01.000 --> 00:00:02.000\nsecond\ncue\n"
+    )
+    assert services._parse_vtt(content) == ["hello there", "second cue"]
+
+
+def test_parse_vtt_empty_cue():
+    content = b"00:00:00.000 --> 00:00:01.000\n\n00:00:01.000 --> 00:00:02.000\nhello\nworld"
+    assert services._parse_vtt(content) == ["hello world"]
+
+
+def test_parse_vtt_cue_without_blank_separator():
+    content = b"00:00:00.000 --> 00:00:01.000\n00:00:01.000 --> 00:00:02.000\nhello\n"
+    assert services._parse_vtt(content) == ["hello"]
+
+
+@pytest.mark.parametrize("timestamp, seconds", [("45", 45), ("1:23", 83), ("01:02:03", 3723), ("1.5", 1.5)])
+def test_timestamp_to_seconds(timestamp, seconds):
+    assert services.timestamp_to_seconds(timestamp) == seconds
+
+
+@pytest.mark.parametrize("timestamp", ["", ":", "::", "1::2", "1:", "1:2:3:4"])
+def test_timestamp_to_seconds_rejects_malformed(timestamp):
+    with pytest.raises(ValueError):
+        services.timestamp_to_seconds(timestamp)
+
+
+@pytest.fixture
+def negative_cache(cache_dir, monkeypatch):
+    """An empty negative cache whose background writes run inline"""
+    monkeypatch.setattr(services, "_negative_cache", {})
+    monkeypatch.setattr(services, "_negative_cache_loaded", set())
+    monkeypatch.setattr(services, "_persist_in_background", lambda save_fn, *args: save_fn(*args))
+
+
+def test_negative_cache_entry_expires(negative_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(services, "time", SimpleNamespace(time=lambda: now[0]))
+    services._remember_failure(VIDEO_ID, "transcript")
+    assert services._recently_failed(VIDEO_ID, "transcript")
+    now[0] += services.NEGATIVE_CACHE_TTL_SECONDS + 1
+    assert not services._recently_failed(VIDEO_ID, "transcript")
+
+
+def test_transcript_without_captions_is_remembered(negative_cache):
+    assert services.get_transcript(VIDEO_ID, info={}) == []
+    assert services._recently_failed(VIDEO_ID, "transcript")
+
+
+class _ErrorResponse:
+    ok = False
+    status_code = 429
+
+    def close(self):
+        pass
+
+
+def test_transcript_http_error_is_not_remembered(negative_cache, monkeypatch):
+    monkeypatch.setattr(services._SESSION, "get", lambda *args, **kwargs: _ErrorResponse())
+    info = {"subtitles": {"en": [{"url": "https://example.com/captions.vtt"}]}}
+    assert services.get_transcript(VIDEO_ID, info=info) == []
+    assert not services._recently_failed(VIDEO_ID, "transcript")
+    assert cache_manager.load_step(VIDEO_ID, "transcript") is None
+
+
+def test_frame_failure_is_remembered_after_fresh_url_retry(negative_cache, monkeypatch):
+    attempts = []
+    forgotten = []
+
+    def failing_extract(video_url, timestamp_seconds):
+        attempts.append(timestamp_seconds)
+        raise Exception("HTTP Error 403")
+
+    monkeypatch.setattr(services, "extract_frame_at_time", failing_extract)
+    monkeypatch.setattr(services, "_forget_stream_url", forgotten.append)
+    url = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+    assert services.extract_best_frame_bytes(url, "0:10", "Chop the onion", "1") is None
+    assert attempts == [10, 10]
+    assert forgotten == [url]
+    # Not tried again while the failure is remembered
+    assert services.extract_best_frame_bytes(url, "0:10", "Chop the onion", "1") is None
+    assert len(attempts) == 2
@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback } from 'react'
 import { useAuth as useClerkAuth, useUser } from '@clerk/clerk-react'
 import { API_BASE_URL } from '../config'
+import { getVideoId } from '../youtube'
 import Navigation from './Navigation'
 import ExtractionModal from './ExtractionModal'
 import ErrorModal from './ErrorModal'
@@ -48,12 +49,7 @@ export default function RecipeCollection() {
     setError(null)
 
     // Extract video ID from URL first to show modal immediately
-    let videoId: string | null = null
-    if (extractUrl.includes('youtube.com/watch?v=')) {
-      videoId = extractUrl.split('v=')[1]?.split('&')[0] || null
-    } else if (extractUrl.includes('youtu.be/')) {
-      videoId = extractUrl.split('youtu.be/')[1]?.split('?')[0] || null
-    }
+    const videoId = getVideoId(extractUrl)
 
     // Show modal immediately when extraction starts
     if (videoId) {
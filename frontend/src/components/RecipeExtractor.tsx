@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import { useLocation, useNavigate } from 'react-router-dom'
 import { useAuth as useClerkAuth } from '@clerk/clerk-react'
 import { API_BASE_URL } from '../config'
+import { getVideoId } from '../youtube'
 import PizzaTracker from './PizzaTracker'
 import Navigation from './Navigation'
 import ErrorModal from './ErrorModal'
@@ -128,9 +129,7 @@ export default function RecipeExtractor() {
     }
   }
 
-  const videoId =
-    url.split('v=')[1]?.split('&')[0] ||
-    url.split('youtu.be/')[1]?.split('?')[0]
+  const videoId = getVideoId(url)
 
   return (
     <div className="recipe-extractor">
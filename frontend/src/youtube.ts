@@ -0,0 +1,6 @@
+// Same pattern as get_video_id in backend/services.py
+const VIDEO_ID_RE = /(?:v=|youtu\.be\/|\/shorts\/|\/embed\/)([A-Za-z0-9_-]{11})/
+
+export function getVideoId(url: string): string | null {
+  return VIDEO_ID_RE.exec(url)?.[1] ?? null
+}